@@ -1,97 +1,149 @@
 from flask import Blueprint, redirect, url_for, render_template, session, request, flash, jsonify
-import sqlite3
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-import os
-import time
-from werkzeug.utils import secure_filename
-from dotenv import load_dotenv
-
-load_dotenv()
+from db import get_db
+from pagination import page_args, keyset_union_page
+from records import FeedPost
+from cache import invalidate
+from uploads import release_media
+from outbox import outbox, queue_deletions
+from gallery import release_gallery
 
 actions_bp = Blueprint('actions_bp', __name__)
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET')
-)
+# One SELECT per category for the admin post feed. Each arm projects the same
+# columns so they can be combined with UNION ALL and ordered by SQLite.
+POST_FEED_SOURCES = {
+    'Leadership': "SELECT id, name AS title, 'leadership' AS type, created_date AS date, 'Leadership' AS category, archived FROM leaders",
+    'Opportunity': "SELECT id, title, type, created_date AS date, 'Opportunity' AS category, archived FROM opportunities WHERE type != 'announcement'",
+    'Announcement': "SELECT id, title, type, created_date AS date, 'Announcement' AS category, archived FROM opportunities WHERE type = 'announcement'",
+    'Activity': "SELECT id, title, 'activity' AS type, created_date AS date, 'Activity' AS category, archived FROM activities",
+    'Document': "SELECT id, title, 'document' AS type, upload_date AS date, 'Document' AS category, archived FROM documents",
+}
+POST_FEED_ORDER = (('date', 'DESC'), ('category', 'DESC'), ('id', 'DESC'))
+
+# Feed category -> table holding its posts
+POST_TABLES = {
+    'Leadership': 'leaders',
+    'Opportunity': 'opportunities',
+    'Announcement': 'opportunities',
+    'Activity': 'activities',
+    'Document': 'documents',
+}
+# Table -> (public_id column, SQL giving the media's resource type)
+POST_MEDIA = {
+    'leaders': ('picture_public_id', "'image'"),
+    'opportunities': ('media_public_id', "CASE media_type WHEN 'image' THEN 'image' ELSE 'video' END"),
+    'activities': ('media_public_id', "CASE media_type WHEN 'image' THEN 'image' ELSE 'video' END"),
+    'documents': ('cloudinary_public_id', "'raw'"),
+}
+# Re-categorising moves opportunities between the two feed categories and
+# documents between their own categories
+OPPORTUNITY_TYPES = {'Opportunity': 'opportunity', 'Announcement': 'announcement'}
+DOCUMENT_CATEGORIES = ('research', 'notes', 'past-papers', 'other')
+BULK_MAX_POSTS = 500
+
+def _group_posts(posts):
+    """{table: [ids]} for (category, id) pairs"""
+    groups = {}
+    for category, post_id in posts:
+        if category not in POST_TABLES:
+            raise ValueError(f'Unknown category: {category}')
+        groups.setdefault(POST_TABLES[category], []).append(post_id)
+    return {table: list(dict.fromkeys(ids)) for table, ids in groups.items()}
+
+def _stale_tags(table, ids):
+    return [table] + [f'{table}:{post_id}' for post_id in ids]
+
+def delete_posts(cur, posts):
+    """Delete (category, id) pairs inside the caller's transaction.
+
+    Media no other post shares is queued on the outbox, which destroys it
+    in batches. Returns (rows deleted, cache tags to invalidate).
+    """
+    deleted = 0
+    stale = []
+    assets = {}
+    for table, ids in _group_posts(posts).items():
+        public_id_column, resource_type = POST_MEDIA[table]
+        placeholders = ', '.join('?' for _ in ids)
+        cur.execute(f'''
+            SELECT {public_id_column}, {resource_type} FROM {table}
+            WHERE id IN ({placeholders}) AND {public_id_column} IS NOT NULL AND {public_id_column} != ''
+        ''', ids)
+        media = cur.fetchall()
+        if table == 'activities':
+            release_gallery(cur, ids)
+        cur.executemany(f'DELETE FROM {table} WHERE id = ?', [(post_id,) for post_id in ids])
+        deleted += cur.rowcount
+        for public_id, kind in media:
+            if release_media(cur, public_id):
+                assets[public_id] = kind
+        stale += _stale_tags(table, ids)
+    queue_deletions(cur, list(assets.items()))
+    return deleted, stale
+
+def archive_posts(cur, posts, archived=True):
+    """Hide (category, id) pairs from the public pages, or bring them back"""
+    updated = 0
+    stale = []
+    for table, ids in _group_posts(posts).items():
+        cur.executemany(f'UPDATE {table} SET archived = ? WHERE id = ? AND archived != ?',
+                        [(int(archived), post_id, int(archived)) for post_id in ids])
+        updated += cur.rowcount
+        stale += _stale_tags(table, ids)
+    return updated, stale
+
+def recategorise_posts(cur, posts, category):
+    """Move opportunities to another feed category, or documents to
+    another document category"""
+    groups = _group_posts(posts)
+    if category in OPPORTUNITY_TYPES:
+        table, column, value = 'opportunities', 'type', OPPORTUNITY_TYPES[category]
+    elif category in DOCUMENT_CATEGORIES:
+        table, column, value = 'documents', 'category', category
+    else:
+        raise ValueError(f'Unknown category: {category}')
+    if set(groups) != {table}:
+        raise ValueError(f'Only {table} can be moved to {category}')
+    cur.executemany(f'UPDATE {table} SET {column} = ? WHERE id = ? AND {column} != ?',
+                    [(value, post_id, value) for post_id in groups[table]])
+    return cur.rowcount, _stale_tags(table, groups[table])
+
+
+def _parse_posts(value):
+    """Accept [[category, id], ...] or [{"category": .., "id": ..}, ...]"""
+    if not isinstance(value, list) or not value:
+        raise ValueError('Select at least one post')
+    if len(value) > BULK_MAX_POSTS:
+        raise ValueError(f'Select at most {BULK_MAX_POSTS} posts at once')
+    posts = []
+    for item in value:
+        if isinstance(item, dict):
+            item = (item.get('category'), item.get('id'))
+        try:
+            category, post_id = item
+            posts.append((category, int(post_id)))
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid post: {item}')
+    return posts
 
 @actions_bp.route('/actions', methods=['GET', 'POST'])
 def actions():
     if not session.get('admin_logged_in'):
-        return redirect(url_for('admin_login'))
-    
-    # Fetch all posts from all categories
-    conn = sqlite3.connect('tamsa.db')
-    cur = conn.cursor()
-    
-    # Fetch leaders
-    cur.execute('SELECT id, name, "leadership" as type, created_date FROM leaders ORDER BY created_date DESC')
-    leaders = cur.fetchall()
-    
-    # Fetch opportunities (announcements and opportunities)
-    cur.execute('SELECT id, title, type, created_date FROM opportunities ORDER BY created_date DESC')
-    opportunities = cur.fetchall()
-    
-    # Fetch activities
-    cur.execute('SELECT id, title, "activity" as type, created_date FROM activities ORDER BY created_date DESC')
-    activities = cur.fetchall()
-    
-    # Fetch documents
-    cur.execute('SELECT id, title, "document" as type, upload_date FROM documents ORDER BY upload_date DESC')
-    documents = cur.fetchall()
-    
-    conn.close()
-    
-    # Combine all posts
-    all_posts = []
-    
-    # Add leaders
-    for post in leaders:
-        all_posts.append({
-            'id': post[0],
-            'title': post[1],
-            'type': post[2],
-            'date': post[3],
-            'category': 'Leadership'
-        })
-    
-    # Add opportunities and announcements
-    for post in opportunities:
-        category = 'Announcement' if post[2] == 'announcement' else 'Opportunity'
-        all_posts.append({
-            'id': post[0],
-            'title': post[1],
-            'type': post[2],
-           'date': post[3],
-            'category': category
-        })
+        return redirect(url_for('main_bp.admin_login'))
     
-    for post in activities:
-        all_posts.append({
-        'id': post[0],
-        'title': post[1],
-        'type': post[2],
-        'date': post[3],
-        'category': 'Activity'
-    })
+    category = request.args.get('category')
+    if category not in POST_FEED_SOURCES:
+        category = None
+    sources = [category] if category else list(POST_FEED_SOURCES)
     
-    for post in documents:
-        all_posts.append({
-        'id': post[0],
-        'title': post[1],
-        'type': post[2],
-        'date': post[3],
-        'category': 'Document'
-    })
+    # Merge every source into one timeline and let SQLite order and page it
+    per_page, after = page_args(POST_FEED_ORDER, default=30, maximum=100)
+    all_posts, next_cursor = keyset_union_page(get_db(), [POST_FEED_SOURCES[name] for name in sources],
+                                          POST_FEED_ORDER, per_page, after,
+                                          row_type=FeedPost)
     
-    # Sort by date (newest first)
-    all_posts.sort(key=lambda x: x['date'], reverse=True)
-    
-    return render_template('actions.html', posts=all_posts)
+    return render_template('actions.html', posts=all_posts, next_cursor=next_cursor,
+                           categories=list(POST_FEED_SOURCES), selected_category=category)
 
 @actions_bp.route('/actions/delete/<string:category>/<int:post_id>', methods=['POST'])
 def delete_post(category, post_id):
@@ -99,56 +151,69 @@ def delete_post(category, post_id):
     if not session.get('admin_logged_in'):
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
     
     try:
-        if category == 'Leadership':
-            # Get public_id for Cloudinary deletion
-            cur.execute('SELECT picture_public_id FROM leaders WHERE id = ?', (post_id,))
-            result = cur.fetchone()
-            if result and result[0]:
-                cloudinary.uploader.destroy(result[0], resource_type="image")
-            
-            cur.execute('DELETE FROM leaders WHERE id = ?', (post_id,))
-        
-        elif category == 'Opportunity' or category == 'Announcement':
-            # Get public_id for Cloudinary deletion
-            cur.execute('SELECT media_public_id, media_type FROM opportunities WHERE id = ?', (post_id,))
-            result = cur.fetchone()
-            if result and result[0]:
-                resource_type = 'image' if result[1] == 'image' else 'video'
-                cloudinary.uploader.destroy(result[0], resource_type=resource_type)
-            
-            cur.execute('DELETE FROM opportunities WHERE id = ?', (post_id,))
-        
-        elif category == 'Activity':
-            # Get public_id for Cloudinary deletion
-            cur.execute('SELECT media_public_id, media_type FROM activities WHERE id = ?', (post_id,))
-            result = cur.fetchone()
-            if result and result[0]:
-                resource_type = 'image' if result[1] == 'image' else 'video'
-                cloudinary.uploader.destroy(result[0], resource_type=resource_type)
-            
-            cur.execute('DELETE FROM activities WHERE id = ?', (post_id,))
-        
-        elif category == 'Document':
-            # Get public_id for Cloudinary deletion
-            cur.execute('SELECT cloudinary_public_id FROM documents WHERE id = ?', (post_id,))
-            result = cur.fetchone()
-            if result and result[0]:
-                cloudinary.uploader.destroy(result[0], resource_type="raw")
-            
-            cur.execute('DELETE FROM documents WHERE id = ?', (post_id,))
+        # Any media no other post shares is queued for removal from
+        # Cloudinary in the same transaction
+        _, stale = delete_posts(cur, [(category, post_id)])
         
         conn.commit()
+        outbox.notify()
+        invalidate(*stale)
         flash(f'{category} post deleted successfully!', 'success')
         return jsonify({'success': True, 'message': 'Post deleted successfully'})
     
+    except ValueError as e:
+        # An unknown category is the caller's mistake, not a server error
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
     except Exception as e:
         conn.rollback()
         flash(f'Error deleting post: {str(e)}', 'error')
         return jsonify({'success': False, 'message': str(e)}), 500
+
+@actions_bp.route('/actions/bulk/<string:operation>', methods=['POST'])
+def bulk_action(operation):
+    """Delete, archive, unarchive or re-categorise many posts in one transaction.
+
+    Takes JSON {"posts": [[category, id], ...]}, plus "category" for
+    recategorise.
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    if operation not in ('delete', 'archive', 'unarchive', 'recategorise'):
+        return jsonify({'success': False, 'message': f'Unknown operation: {operation}'}), 404
+    
+    payload = request.get_json(silent=True) or {}
+    conn = get_db()
+    cur = conn.cursor()
+    
+    try:
+        posts = _parse_posts(payload.get('posts'))
+        if operation == 'delete':
+            count, stale = delete_posts(cur, posts)
+            message = f'{count} posts deleted'
+        elif operation == 'recategorise':
+            count, stale = recategorise_posts(cur, posts, payload.get('category'))
+            message = f"{count} posts moved to {payload.get('category')}"
+        else:
+            count, stale = archive_posts(cur, posts, archived=operation == 'archive')
+            message = f'{count} posts {operation}d'
+        conn.commit()
+    
+    except ValueError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        conn.rollback()
+        flash(f'Error updating posts: {str(e)}', 'error')
+        return jsonify({'success': False, 'message': str(e)}), 500
     
-    finally:
-        conn.close()
\ No newline at end of file
+    if operation == 'delete':
+        outbox.notify()
+    invalidate(*stale)
+    flash(message, 'success')
+    return jsonify({'success': True, 'message': message, 'count': count})
@@ -0,0 +1,119 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify
+from db import get_db
+from pagination import InvalidCursor, page_args, keyset_page
+from conditional import conditional
+
+api_bp = Blueprint('api_bp', __name__, url_prefix='/api/v1')
+
+# `fields` are the columns clients may ask for (public_ids stay private)
+# and `order` the newest-first listing order
+ApiResource = namedtuple('ApiResource', ['table', 'fields', 'order'])
+
+API_RESOURCES = {
+    'activities': ApiResource(
+        'activities',
+        ('id', 'title', 'description', 'date', 'location', 'media_url', 'media_type', 'author',
+         'created_date', 'modified_date', 'media_status'),
+        (('created_date', 'DESC'), ('id', 'DESC'))),
+    'opportunities': ApiResource(
+        'opportunities',
+        ('id', 'title', 'description', 'type', 'deadline', 'event_date', 'location', 'media_url',
+         'media_type', 'author', 'created_date', 'modified_date', 'media_status'),
+        (('created_date', 'DESC'), ('id', 'DESC'))),
+    'documents': ApiResource(
+        'documents',
+        ('id', 'title', 'category', 'filename', 'cloudinary_url', 'uploader', 'upload_date',
+         'modified_date', 'media_status'),
+        (('upload_date', 'DESC'), ('id', 'DESC'))),
+    'leaders': ApiResource(
+        'leaders',
+        ('id', 'name', 'position', 'picture_url', 'bio', 'order_index', 'created_date',
+         'modified_date', 'media_status'),
+        (('order_index', 'ASC'), ('created_date', 'DESC'), ('id', 'DESC'))),
+}
+
+# Deltas walk every change forward; archived rows and deleted ids are
+# included so clients can drop them
+DELTA_ORDER = (('modified_date', 'ASC'), ('id', 'ASC'))
+
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+
+def _parse_since(value):
+    """Accept 'YYYY-MM-DD HH:MM:SS[.fff]' or ISO 8601 and return SQLite's UTC format"""
+    try:
+        stamp = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    if stamp.microsecond:
+        return stamp.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    return stamp.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _list_view(name, resource):
+    @conditional(resource.table)
+    def view():
+        fields = resource.fields
+        requested = request.args.get('fields')
+        if requested:
+            fields = [f.strip() for f in requested.split(',') if f.strip()]
+            unknown = [f for f in fields if f not in resource.fields]
+            if unknown or not fields:
+                return jsonify({'success': False, 'message': f'Unknown field: {", ".join(unknown) or requested}'}), 400
+
+        order = resource.order
+        where = 'archived = 0'
+        params = ()
+        since = request.args.get('since')
+        if since:
+            stamp = _parse_since(since)
+            if stamp is None:
+                return jsonify({'success': False, 'message': 'since must be a date and time, e.g. 2025-01-31T12:00:00Z'}), 400
+            # Inclusive: a row stamped at the very moment of the client's last
+            # sync may have committed after it, so boundary rows are sent
+            # again and clients upsert by id. Paging then continues from
+            # next_cursor, a (modified_date, id) keyset.
+            where = 'modified_date >= ?'
+            params = (stamp,)
+            order = DELTA_ORDER
+            fields = list(fields) + [col for col in ('archived', 'modified_date') if col not in fields]
+
+        # The sort columns are needed for the cursor even if not requested
+        columns = list(fields) + [col for col, _ in order if col not in fields]
+        try:
+            per_page, after = page_args(order, default=API_PAGE_SIZE, maximum=API_MAX_PAGE_SIZE, strict=True)
+        except InvalidCursor:
+            return jsonify({'success': False, 'message': 'cursor does not belong to this listing'}), 400
+        conn = get_db()
+        rows, next_cursor = keyset_page(conn, resource.table, order, per_page, after,
+                                        columns=', '.join(columns), where=where, params=params)
+
+        data = [dict(zip(fields, row)) for row in rows]
+        payload = {'success': True, 'data': data, 'next_cursor': next_cursor}
+        if since:
+            stamps = [stamp] + ([data[-1]['modified_date']] if data else [])
+            if after is None:
+                # Deletions since the sync point come with the first page
+                cur = conn.cursor()
+                cur.execute('''
+                    SELECT post_id, deleted_date FROM deleted_posts
+                    WHERE table_name = ? AND deleted_date >= ? ORDER BY deleted_date, post_id
+                ''', (resource.table, stamp))
+                deleted = cur.fetchall()
+                payload['deleted'] = [post_id for post_id, _ in deleted]
+                stamps += [deleted_date for _, deleted_date in deleted[-1:]]
+            # Where the next sync starts once next_cursor runs out
+            payload['last_modified'] = max(stamps)
+        return jsonify(payload)
+
+    view.__name__ = f'list_{name}'
+    return view
+
+
+for _name, _resource in API_RESOURCES.items():
+    api_bp.add_url_rule(f'/{_name}', view_func=_list_view(_name, _resource))
@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # gzip siblings are still served
+    brotli = None
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt')
+MIN_COMPRESS_SIZE = 1024
+# Directories whose files already carry a content hash in their name
+PREHASHED_DIRS = ('variants/',)
+FINGERPRINT = re.compile(r'\.([0-9a-f]{12})(\.[^./]+)$')
+
+# Client encoding -> sibling file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class AssetManifest:
+    """Maps static paths to content-hashed URLs and serves them back.
+
+    url_for('static', filename='css/site.css') yields css/site.<hash>.css.
+    Fingerprinted paths are sent with a year-long immutable Cache-Control;
+    anything else keeps Flask's default revalidation. The manifest is built
+    once when the app is created, never while serving a request.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.hashed = {}    # logical path -> fingerprinted path
+        self.originals = {}  # fingerprinted path -> logical path
+        self._lock = threading.Lock()
+        self._built = False
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('STATIC_FINGERPRINT', True)
+        app.config.setdefault('STATIC_PRECOMPRESS', True)
+        if app.config['STATIC_FINGERPRINT']:
+            app.url_defaults(self._inject_fingerprint)
+        app.view_functions['static'] = self.send_static
+        self.ensure_built()
+
+    def ensure_built(self):
+        with self._lock:
+            if not self._built:
+                self._build()
+
+    def build(self):
+        """Hash every static file and write .gz/.br siblings for text assets"""
+        with self._lock:
+            self._build()
+
+    def _build(self):
+        static_folder = self.app.static_folder
+        hashed = {}
+        for root, dirs, files in os.walk(static_folder):
+            for name in files:
+                path = os.path.join(root, name)
+                logical = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                if name.endswith(('.gz', '.br', '.tmp')) or logical.startswith(PREHASHED_DIRS):
+                    continue
+                if self.app.config['STATIC_PRECOMPRESS'] and name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    precompress(path)
+                stem, extension = os.path.splitext(logical)
+                hashed[logical] = f'{stem}.{_file_hash(path)}{extension}'
+
+        self.originals = {v: k for k, v in hashed.items()}
+        self.hashed = hashed
+        self._built = True
+
+    def _inject_fingerprint(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.hashed.get(values['filename'], values['filename'])
+
+    def send_static(self, filename):
+        logical = self.originals.get(filename)
+        immutable = logical is not None or filename.startswith(PREHASHED_DIRS)
+        if logical is None:
+            logical = filename
+            # A page cached before a deploy may still point at an old hash
+            match = FINGERPRINT.search(filename)
+            if match and not filename.startswith(PREHASHED_DIRS) and filename not in self.hashed:
+                logical = filename[:match.start()] + match.group(2)
+
+        response = _send_precompressed(logical)
+        if immutable:
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def precompress(path):
+    """Write gzip (and brotli, if installed) copies next to a file when stale"""
+    if os.path.getsize(path) < MIN_COMPRESS_SIZE:
+        return
+    mtime = os.path.getmtime(path)
+    targets = [('.gz', lambda data: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        targets.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    data = None
+    for suffix, compress in targets:
+        target = path + suffix
+        if os.path.exists(target) and os.path.getmtime(target) >= mtime:
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        # Workers starting together may compress the same file
+        tmp = f'{target}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(compress(data))
+        os.replace(tmp, target)
+
+
+def _send_precompressed(filename):
+    static_folder = current_app.static_folder
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+                response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+    response = send_from_directory(static_folder, filename, mimetype=mimetype)
+    if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+assets = AssetManifest()
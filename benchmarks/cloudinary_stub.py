@@ -0,0 +1,103 @@
+"""A local stand-in for the Cloudinary upload and admin APIs.
+
+Point the app at it with CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:<port>.
+Uploads are read and discarded, deletions always succeed and listings are
+empty. An optional delay simulates the round-trip to the real service.
+
+    python benchmarks/cloudinary_stub.py --port 9100 --delay 0.05
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _reply(self, payload, status=200):
+        time.sleep(self.server.delay)
+        self.server.calls += 1
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _parts(self):
+        # /v1_1/<cloud>/<resource_type>/<action> or /v1_1/<cloud>/resources/<resource_type>/<type>
+        return urlsplit(self.path).path.strip('/').split('/')
+
+    def do_POST(self):
+        self._body()
+        parts = self._parts()
+        cloud, resource_type = parts[1], parts[2]
+        public_id = f'tamsa/bench/{uuid.uuid4().hex}'
+        self._reply({
+            'public_id': public_id,
+            'resource_type': resource_type,
+            'secure_url': f'https://res.cloudinary.com/{cloud}/{resource_type}/upload/v1/{public_id}',
+            'bytes': int(self.headers.get('Content-Length') or 0),
+        })
+
+    def do_DELETE(self):
+        body = self._body()
+        params = parse_qs(urlsplit(self.path).query)
+        if body:
+            try:
+                params.update(json.loads(body))
+            except ValueError:
+                params.update(parse_qs(body.decode()))
+        # The SDK sends public_ids[0]=a&public_ids[1]=b
+        ids = [value for key, values in params.items() if key.startswith('public_ids')
+               for value in (values if isinstance(values, list) else [values])]
+        self._reply({'deleted': {public_id: 'deleted' for public_id in ids}})
+
+    def do_GET(self):
+        self._reply({'resources': []})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, delay=0.0):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        self.delay = delay
+        self.calls = 0
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='cloudinary-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=9100)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds added to every call')
+    args = parser.parse_args()
+    server = StubServer(args.port, args.delay)
+    print(f'Cloudinary stub on {server.url}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""Route benchmarks against seeded databases, in-process and under gunicorn.
+
+    python benchmarks/routes.py run --scales 1000,10000 --json after.json
+    python benchmarks/routes.py compare before.json after.json
+
+`run` seeds one database per scale (rows per table), starts the Cloudinary
+stub, then measures every route through Flask's test client and through a
+multi-worker gunicorn server. Each route reports p50/p95/p99 latency and
+throughput; each run reports peak RSS. `compare` lines up two result
+files and exits non-zero when a route got slower than --threshold percent.
+
+The page cache is off unless --page-cache is given, so the numbers reflect
+the route rather than a cache hit.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from cloudinary_stub import StubServer  # noqa: E402
+
+ROUTES = ('/', '/activities', '/documents', '/opportunities', '/leadership', '/actions',
+          '/search?q=football', '/api/v1/activities')
+ADMIN_ROUTES = ('/actions',)
+ADMIN_PASSWORD = 'benchmark'
+DEFAULT_SCALES = '1000,10000,100000'
+
+
+def summarise(latencies, wall, errors):
+    """Latency percentiles in milliseconds plus throughput for one route"""
+    ms = sorted(latency * 1000 for latency in latencies)
+    if len(ms) > 1:
+        cuts = statistics.quantiles(ms, n=100, method='inclusive')
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = ms[0] if ms else 0.0
+    return {
+        'requests': len(ms),
+        'errors': errors,
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+        'mean_ms': round(statistics.fmean(ms), 3) if ms else 0.0,
+        'throughput_rps': round(len(ms) / wall, 1) if wall else 0.0,
+    }
+
+
+def _environment(db_path, stub_url, page_cache, spool_dir):
+    return dict(
+        os.environ,
+        TAMSA_DB_PATH=db_path,
+        TAMSA_UPLOAD_SPOOL_DIR=spool_dir,
+        TAMSA_PAGE_CACHE='1' if page_cache else '0',
+        ADMIN_PASSWORD=ADMIN_PASSWORD,
+        CLOUDINARY_CLOUD_NAME='bench',
+        CLOUDINARY_API_KEY='bench',
+        CLOUDINARY_API_SECRET='bench',
+        CLOUDINARY_UPLOAD_PREFIX=stub_url,
+    )
+
+
+def seeded_database(data_dir, rows, env):
+    """Path of a database with `rows` rows per table, seeding it if needed"""
+    path = os.path.join(data_dir, f'bench-{rows}.db')
+    if not os.path.exists(path):
+        print(f'Seeding {rows} rows per table...', file=sys.stderr)
+        subprocess.run([sys.executable, os.path.join(BENCH_DIR, 'seed.py'), '--rows', str(rows), path],
+                       cwd=ROOT, env=dict(env, TAMSA_DB_PATH=path), check=True, stdout=subprocess.DEVNULL)
+    return path
+
+
+# Test client
+
+def testclient_main(args):
+    """Runs inside a fresh interpreter so its peak RSS is its own"""
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    import tamsa
+
+    app = tamsa.create_app()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+
+    results = {}
+    for route in args.routes:
+        for _ in range(args.warmup):
+            client.get(route)
+        latencies, errors = [], 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get(route)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+        results[route] = summarise(latencies, time.perf_counter() - started, errors)
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({'routes': results, 'peak_rss_mb': round(peak_rss, 1)}))
+
+
+def run_testclient(env, routes, requests, warmup):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '_testclient', '--requests', str(requests),
+                          '--warmup', str(warmup), *routes],
+                         cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+# gunicorn
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _request(conn, path, cookie=None, method='GET', body=None, headers=None):
+    headers = dict(headers or {})
+    if cookie:
+        headers['Cookie'] = cookie
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    return response
+
+
+def _wait_ready(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            if _request(conn, '/api/v1/leaders').status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def _login(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    response = _request(conn, '/admin/login', method='POST', body=urlencode({'password': ADMIN_PASSWORD}),
+                        headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    cookie = response.getheader('Set-Cookie', '').split(';')[0]
+    if response.status != 302 or not cookie:
+        raise RuntimeError('Could not log in as admin')
+    return cookie
+
+
+def _process_tree(pid):
+    pids = [pid]
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return pids
+
+
+def _peak_rss_mb(pid):
+    """VmHWM (peak resident set) of a process, in MiB"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _drive(port, route, cookie, requests, concurrency):
+    """Closed-loop load: `concurrency` keep-alive clients share `requests`"""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local = []
+        local_errors = 0
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            start = time.perf_counter()
+            try:
+                status = _request(conn, route, cookie).status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                status = 599
+            local.append(time.perf_counter() - start)
+            local_errors += status >= 400
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarise(latencies, time.perf_counter() - started, errors[0])
+
+
+def run_server(env, routes, requests, warmup, workers, threads, concurrency):
+    port = _free_port()
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                               '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+                               '--threads', str(threads), '--access-logfile', '/dev/null'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port)
+        cookie = _login(port)
+        results = {}
+        for route in routes:
+            route_cookie = cookie if route in ADMIN_ROUTES else None
+            _drive(port, route, route_cookie, warmup * concurrency, concurrency)
+            results[route] = _drive(port, route, route_cookie, requests, concurrency)
+        rss = [_peak_rss_mb(pid) for pid in _process_tree(server.pid)]
+        return {
+            'routes': results,
+            'peak_rss_mb': round(sum(rss), 1),
+            'peak_worker_rss_mb': round(max(rss[1:] or [0.0]), 1),
+        }
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+# Reporting
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scenario(scenario):
+    print(f'\n{scenario["mode"]} @ {scenario["scale"]} rows/table, peak RSS {scenario["peak_rss_mb"]} MiB')
+    print(f'{"route":<24}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>10}{"errors":>8}')
+    for route, stats in scenario['routes'].items():
+        print(f'{route:<24}{stats["p50_ms"]:>10.2f}{stats["p95_ms"]:>10.2f}{stats["p99_ms"]:>10.2f}'
+              f'{stats["throughput_rps"]:>10.1f}{stats["errors"]:>8}')
+
+
+def run_main(args):
+    scales = [int(s) for s in args.scales.split(',') if s]
+    modes = ('testclient', 'server') if args.mode == 'both' else (args.mode,)
+    concurrency = args.concurrency or args.workers * args.threads
+    scratch = None if args.data_dir else tempfile.TemporaryDirectory(prefix='tamsa-bench-')
+    data_dir = args.data_dir or scratch.name
+    os.makedirs(data_dir, exist_ok=True)
+
+    stub = StubServer(delay=args.stub_delay).start()
+    results = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'workers': args.workers,
+            'threads': args.threads,
+            'concurrency': concurrency,
+            'page_cache': args.page_cache,
+        },
+        'scenarios': [],
+    }
+    try:
+        with tempfile.TemporaryDirectory() as spool_dir:
+            env = _environment('', stub.url, args.page_cache, spool_dir)
+            for rows in scales:
+                env['TAMSA_DB_PATH'] = seeded_database(data_dir, rows, env)
+                for mode in modes:
+                    if mode == 'testclient':
+                        outcome = run_testclient(env, args.routes, args.requests, args.warmup)
+                    else:
+                        outcome = run_server(env, args.routes, args.requests, args.warmup,
+                                             args.workers, args.threads, concurrency)
+                    scenario = {'scale': rows, 'mode': mode, **outcome}
+                    results['scenarios'].append(scenario)
+                    print_scenario(scenario)
+    finally:
+        stub.stop()
+        if scratch is not None:
+            scratch.cleanup()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {args.json}')
+
+
+def compare_main(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    before = {(s['scale'], s['mode'], route): stats
+              for s in baseline['scenarios'] for route, stats in s['routes'].items()}
+    regressions = 0
+    print(f'{"scale":>8} {"mode":<11}{"route":<24}{"p95 before":>12}{"p95 after":>12}{"change":>9}')
+    for scenario in candidate['scenarios']:
+        for route, stats in scenario['routes'].items():
+            old = before.get((scenario['scale'], scenario['mode'], route))
+            if old is None or not old['p95_ms']:
+                continue
+            change = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+            flag = ''
+            if change > args.threshold:
+                regressions += 1
+                flag = '  SLOWER'
+            print(f'{scenario["scale"]:>8} {scenario["mode"]:<11}{route:<24}{old["p95_ms"]:>12.2f}'
+                  f'{stats["p95_ms"]:>12.2f}{change:>8.1f}%{flag}')
+    if regressions:
+        print(f'\n{regressions} route(s) more than {args.threshold}% slower at p95')
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='seed, benchmark and report')
+    run.add_argument('--scales', default=DEFAULT_SCALES, help='comma-separated rows per table')
+    run.add_argument('--mode', choices=('testclient', 'server', 'both'), default='both')
+    run.add_argument('--routes', nargs='+', default=list(ROUTES))
+    run.add_argument('--requests', type=int, default=500, help='measured requests per route')
+    run.add_argument('--warmup', type=int, default=20, help='unmeasured requests per route (per client)')
+    run.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1))
+    run.add_argument('--threads', type=int, default=4)
+    run.add_argument('--concurrency', type=int, help='simultaneous clients (default workers x threads)')
+    run.add_argument('--page-cache', action='store_true', help='leave the rendered-page cache on')
+    run.add_argument('--stub-delay', type=float, default=0.0, help='seconds added to each Cloudinary call')
+    run.add_argument('--data-dir', help='keep seeded databases here and reuse them')
+    run.add_argument('--json', help='write results to this file')
+    run.set_defaults(func=run_main)
+
+    compare = commands.add_parser('compare', help='compare two result files')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.add_argument('--threshold', type=float, default=10.0, help='allowed p95 slowdown in percent')
+    compare.set_defaults(func=compare_main)
+
+    testclient = commands.add_parser('_testclient')
+    testclient.add_argument('--requests', type=int)
+    testclient.add_argument('--warmup', type=int)
+    testclient.add_argument('routes', nargs='+')
+    testclient.set_defaults(func=testclient_main)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Fill a database with synthetic posts for benchmarking.
+
+    python benchmarks/seed.py --rows 10000 bench.db
+
+Every content table gets `rows` rows with media already marked ready, so
+no upload jobs are queued. Output is deterministic for a given row count.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+WORDS = ('football', 'udom', 'students', 'science', 'workshop', 'dodoma', 'health', 'training',
+         'scholarship', 'internship', 'community', 'research', 'meeting', 'graduation', 'sports',
+         'volunteer', 'library', 'conference', 'campus', 'seminar', 'music', 'culture', 'debate')
+STUB_MEDIA = 'https://res.cloudinary.com/bench/image/upload/v1/tamsa/bench'
+BATCH = 5000
+
+
+def _text(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def _stamp(start, index, rows):
+    # Spread posts over the past year, newest last
+    return (start + timedelta(seconds=index * 365 * 24 * 3600 // max(rows, 1))).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _rows(rows):
+    rng = random.Random(rows)
+    start = datetime(2025, 1, 1)
+    for i in range(rows):
+        yield i, rng, _stamp(start, i, rows)
+
+
+def _insert(cur, sql, values):
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) >= BATCH:
+            cur.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        cur.executemany(sql, batch)
+
+
+def seed(path, rows):
+    """Create (or upgrade) the schema at `path` and add `rows` posts per table"""
+    import tamsa
+    import migrations
+    from db import get_db
+
+    app = tamsa.create_app({'DATABASE': path, 'METRICS_ENABLED': False})
+    with app.app_context():
+        migrations.migrate()
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('BEGIN')
+        _insert(cur, '''
+            INSERT INTO activities (title, description, date, location, media_url, media_public_id, media_type,
+                                    author, created_date, media_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'ready')
+        ''', ((_text(rng, 4), _text(rng, 40), stamp[:10], 'Dodoma', f'{STUB_MEDIA}/a{i}.jpg', f'tamsa/bench/a{i}',
+               'video' if i % 10 == 0 else 'image', 'Admin', stamp) for i, rng, stamp in _rows(rows)))
+        _insert(cur, '''
+            INSERT INTO opportunities (title, description, type, deadline, event_date, location, media_url,
+                                       media_public_id, media_type, author, created_date, media_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'ready')
+        ''', ((_text(rng, 5), _text(rng, 60), 'announcement' if i % 3 == 0 else 'opportunity',
+               None if i % 3 == 0 else stamp[:10], stamp[:10] if i % 3 == 0 else None, 'Dodoma',
+               f'{STUB_MEDIA}/o{i}.jpg' if i % 2 else None, f'tamsa/bench/o{i}' if i % 2 else None,
+               'image' if i % 2 else None, 'Admin' if i % 4 else 'User', stamp) for i, rng, stamp in _rows(rows)))
+        _insert(cur, '''
+            INSERT INTO documents (title, category, filename, cloudinary_url, cloudinary_public_id, uploader,
+                                   upload_date, media_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'ready')
+        ''', ((_text(rng, 4), rng.choice(('Constitution', 'Minutes', 'Reports', 'Forms')), f'doc{i}.pdf',
+               f'{STUB_MEDIA}/d{i}.pdf', f'tamsa/bench/d{i}', 'Admin', stamp) for i, rng, stamp in _rows(rows)))
+        _insert(cur, '''
+            INSERT INTO leaders (name, position, picture_url, picture_public_id, bio, order_index, created_date,
+                                 media_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 'ready')
+        ''', ((_text(rng, 2).title(), _text(rng, 2).title(), f'{STUB_MEDIA}/l{i}.jpg', f'tamsa/bench/l{i}',
+               _text(rng, 20), i % 20, stamp) for i, rng, stamp in _rows(rows)))
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('database')
+    parser.add_argument('--rows', type=int, default=1000, help='rows per table')
+    args = parser.parse_args()
+    seed(args.database, args.rows)
+    print(f'Seeded {args.rows} rows per table into {args.database}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Startup latency: cold import, create_app() and the first requests.
+
+Each run is a fresh interpreter so nothing is shared through sys.modules:
+
+    python benchmarks/startup.py --runs 20 --json startup.json
+
+The database is a throwaway copy migrated beforehand, so the first request
+measures worker start-up and template compilation, not schema creation.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import tamsa
+imported = time.perf_counter()
+app = tamsa.create_app()
+created = time.perf_counter()
+client = app.test_client()
+status = client.get(sys.argv[1]).status_code
+first = time.perf_counter()
+client.get(sys.argv[1])
+second = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (first - created) * 1000,
+    'second_request_ms': (second - first) * 1000,
+    'status': status,
+}))
+'''
+
+MIGRATE = 'import tamsa, migrations\nwith tamsa.create_app().app_context(): migrations.migrate()'
+
+
+def run(runs, path):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, TAMSA_DB_PATH=os.path.join(tmp, 'startup.db'),
+                   TAMSA_UPLOAD_SPOOL_DIR=os.path.join(tmp, 'spool'))
+        subprocess.run([sys.executable, '-c', MIGRATE], cwd=ROOT, env=env, check=True)
+
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, '-c', PROBE, path], cwd=ROOT, env=env,
+                                 check=True, capture_output=True, text=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+    return samples
+
+
+def summarise(samples):
+    summary = {}
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'second_request_ms'):
+        values = sorted(s[key] for s in samples)
+        summary[key] = {
+            'median': round(statistics.median(values), 2),
+            'min': round(values[0], 2),
+            'max': round(values[-1], 2),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/', help='URL requested after start-up')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    samples = run(args.runs, args.path)
+    summary = summarise(samples)
+    for key, stats in summary.items():
+        print(f'{key:<20} median {stats["median"]:>8.2f}  min {stats["min"]:>8.2f}  max {stats["max"]:>8.2f}')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'runs': args.runs, 'path': args.path, 'summary': summary, 'samples': samples}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
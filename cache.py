@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request, session
+from compression import compress, compressed_response, compression_enabled, request_encoding
+from conditional import table_versions
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 300.0
+
+
+class PageCache:
+    """Size-bounded LRU of rendered pages with a TTL and tag invalidation.
+
+    Each entry carries the tags it was rendered from (a table name, or
+    'table:id' for a detail page) and the content versions of those tables
+    at render time. A lookup with different versions is a miss, so writes
+    made by other processes are seen at once; invalidate() only frees this
+    process's copies early. Compressed copies of a body are kept alongside
+    it so a hit doesn't recompress.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def _current(self, key, versions):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] < time.monotonic() or entry[4] != versions:
+            self._drop(key)
+            return None
+        return entry
+
+    def get(self, key, versions=()):
+        with self._lock:
+            entry = self._current(key, tuple(versions))
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def get_encoded(self, key, encoding, versions=()):
+        with self._lock:
+            entry = self._current(key, tuple(versions))
+            return entry[3].get(encoding) if entry else None
+
+    def set_encoded(self, key, encoding, data):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[3][encoding] = data
+
+    def set(self, key, body, tags=(), versions=()):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (body, tuple(tags), time.monotonic() + self.ttl, {}, tuple(versions))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, key):
+        tags = self._entries.pop(key)[1]
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+page_cache = PageCache()
+
+
+def invalidate(*tags):
+    """Drop this process's cached pages rendered from any of the given tags.
+
+    Other workers notice the write through content_versions instead.
+    """
+    page_cache.invalidate(*tags)
+
+
+def _page_versions(tags):
+    """Content versions of the tables a page's tags name, as one read.
+
+    Under @conditional the versions behind the ETag are reused, so the
+    cached body always matches the ETag sent with it.
+    """
+    tables = sorted({tag.split(':', 1)[0] for tag in tags})
+    if not tables:
+        return ()
+    versions = g.get('content_versions')
+    if versions is None or [v[0] for v in versions] != tables:
+        versions = table_versions(*tables)
+    return tuple(tuple(v) for v in versions)
+
+
+def cached_page(*tags):
+    """Cache the GET response of a view as rendered HTML.
+
+    Tags may reference view arguments, e.g. 'opportunities:{opp_id}'. Pages
+    are rendered normally when there are pending flash messages, since those
+    are per-visitor. Entries are checked against the content versions of
+    the tagged tables, so writes by any worker are seen at once. With
+    COMPRESS_RESPONSES on, the compressed body is cached too and served
+    as-is.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (request.method != 'GET'
+                    or not current_app.config.get('PAGE_CACHE_ENABLED', True)
+                    or session.get('_flashes')):
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            versions = _page_versions(tags)
+            encoding = request_encoding() if compression_enabled() else None
+            if encoding:
+                data = page_cache.get_encoded(key, encoding, versions)
+                if data is not None:
+                    return compressed_response(data, encoding)
+
+            body = page_cache.get(key, versions)
+            if body is None:
+                rv = view(*args, **kwargs)
+                if not isinstance(rv, str):
+                    return rv
+                page_cache.set(key, rv, [tag.format(**kwargs) for tag in tags], versions)
+                body = rv
+
+            if encoding and len(body) >= current_app.config.get('COMPRESS_MIN_SIZE', 0):
+                data = compress(body.encode(), encoding, cached=True)
+                page_cache.set_encoded(key, encoding, data)
+                return compressed_response(data, encoding)
+            return body
+        return wrapper
+    return decorator
+
+
+def init_app(app):
+    """Size the shared page cache from the app config"""
+    app.config.setdefault('PAGE_CACHE_ENABLED', True)
+    page_cache.max_entries = app.config.setdefault('PAGE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+    page_cache.ttl = app.config.setdefault('PAGE_CACHE_TTL', DEFAULT_TTL)
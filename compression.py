@@ -0,0 +1,185 @@
+import gzip
+import zlib
+from flask import Response, current_app, request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+DEFAULT_ENABLED = False
+DEFAULT_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('text/html', 'text/css', 'text/plain', 'text/javascript',
+                      'application/javascript', 'application/json', 'image/svg+xml')
+# Fast settings for responses compressed per request, thorough ones for
+# bodies compressed once and kept in the page cache
+GZIP_LEVEL = 6
+GZIP_CACHED_LEVEL = 9
+BROTLI_QUALITY = 5
+BROTLI_CACHED_QUALITY = 9
+
+
+def negotiate(accept_encoding):
+    """Pick 'br' or 'gzip' from an Accept-Encoding header, or None"""
+    accepted = parse_accept_header(accept_encoding or '')
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, cached=False):
+    """Compress a whole body in one go"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_CACHED_LEVEL if cached else GZIP_LEVEL, mtime=0)
+
+
+def _compressor(encoding):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def compressed_response(data, encoding, mimetype='text/html'):
+    """Response for a body that is already compressed"""
+    response = Response(data, mimetype=mimetype)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def compression_enabled():
+    """Whether the page cache should hand out compressed bodies"""
+    return current_app.config.get('COMPRESS_RESPONSES', False)
+
+
+def request_encoding():
+    return negotiate(request.headers.get('Accept-Encoding'))
+
+
+class CompressionMiddleware:
+    """Compress compressible responses with brotli or gzip.
+
+    Responses that already carry a Content-Encoding (precompressed static
+    files, cached pages) or are smaller than min_size pass straight through,
+    keeping wsgi.file_wrapper intact. Bodies of unknown length are buffered
+    only up to min_size, then compressed as they stream.
+    """
+
+    def __init__(self, app, min_size=DEFAULT_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    def __call__(self, environ, start_response):
+        encoding = None
+        if environ.get('REQUEST_METHOD') != 'HEAD':
+            encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING'))
+        state = {}
+
+        def capture(status, headers, exc_info=None):
+            state['status'] = status
+            state['headers'] = Headers(headers)
+            state['exc_info'] = exc_info
+            return _write_unsupported
+
+        body = self.app(environ, capture)
+        if 'status' in state:
+            decision = self._decide(state, encoding, None)
+            if decision is not None and not decision:
+                start_response(state['status'], self._passthrough_headers(state), state['exc_info'])
+                return body
+        return ClosingIterator(self._stream(body, state, encoding, start_response), getattr(body, 'close', None))
+
+    def _compressible(self, headers):
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        return mimetype in COMPRESSIBLE_TYPES
+
+    def _decide(self, state, encoding, buffered_size):
+        """True/False once it is known whether to compress, None if the
+        body must be buffered further to tell"""
+        headers = state['headers']
+        status = int(state['status'].split(' ', 1)[0])
+        if (encoding is None or status < 200 or status in (204, 304)
+                or 'Content-Encoding' in headers or not self._compressible(headers)
+                or 'no-transform' in headers.get('Cache-Control', '')):
+            return False
+        length = headers.get('Content-Length')
+        if length is not None:
+            return int(length) >= self.min_size
+        if buffered_size is None:
+            return None
+        return buffered_size >= self.min_size
+
+    def _passthrough_headers(self, state):
+        headers = state['headers']
+        if self._compressible(headers) and 'Content-Encoding' not in headers:
+            _add_vary(headers)
+        return headers.to_wsgi_list()
+
+    def _stream(self, body, state, encoding, start_response):
+        iterator = iter(body)
+        buffered = []
+        size = 0
+        exhausted = True
+        for chunk in iterator:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size >= self.min_size:
+                exhausted = False
+                break
+
+        decision = self._decide(state, encoding, size)
+        if not decision:
+            start_response(state['status'], self._passthrough_headers(state), state['exc_info'])
+            yield from buffered
+            if not exhausted:
+                yield from iterator
+            return
+
+        headers = state['headers']
+        headers.pop('Content-Length', None)
+        headers['Content-Encoding'] = encoding
+        _add_vary(headers)
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # Byte-for-byte different from the identity representation
+            headers['ETag'] = 'W/' + etag
+        start_response(state['status'], headers.to_wsgi_list(), state['exc_info'])
+
+        process, finish = _compressor(encoding)
+        for chunk in buffered:
+            out = process(chunk)
+            if out:
+                yield out
+        if not exhausted:
+            for chunk in iterator:
+                out = process(chunk)
+                if out:
+                    yield out
+        yield finish()
+
+
+def _add_vary(headers):
+    vary = [v.strip() for v in headers.get('Vary', '').split(',') if v.strip()]
+    if 'accept-encoding' not in (v.lower() for v in vary):
+        vary.append('Accept-Encoding')
+        headers['Vary'] = ', '.join(vary)
+
+
+def _write_unsupported(data):
+    raise RuntimeError('The write() callable is not supported behind CompressionMiddleware')
+
+
+def init_app(app):
+    """Wrap the app in the compression middleware when COMPRESS_RESPONSES is on"""
+    app.config.setdefault('COMPRESS_RESPONSES', DEFAULT_ENABLED)
+    app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+    if app.config['COMPRESS_RESPONSES']:
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config['COMPRESS_MIN_SIZE'])
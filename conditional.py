@@ -0,0 +1,90 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from flask import g, request, session, make_response
+from db import get_db
+
+CONTENT_TABLES = ('documents', 'activities', 'leaders', 'opportunities')
+
+
+def create_version_triggers(cur):
+    """Create content_versions and the triggers that bump it on every write"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS content_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    for table in CONTENT_TABLES:
+        cur.execute('INSERT OR IGNORE INTO content_versions (table_name) VALUES (?)', (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table}
+            BEGIN
+                UPDATE content_versions SET version = version + 1, updated_date = CURRENT_TIMESTAMP
+                WHERE table_name = '{table}';
+            END
+            ''')
+
+
+def table_versions(*tables):
+    """Return [(table, version, updated_date)] for the given tables"""
+    placeholders = ', '.join('?' for _ in tables)
+    cur = get_db().cursor()
+    cur.execute(f'''
+        SELECT table_name, version, updated_date FROM content_versions
+        WHERE table_name IN ({placeholders}) ORDER BY table_name
+    ''', tables)
+    return cur.fetchall()
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+
+def conditional(*tables):
+    """Answer conditional GETs for a view from the version of its tables.
+
+    The ETag covers the endpoint, its arguments and the current version of
+    each table, so a matching If-None-Match gets a 304 before the view runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            versions = table_versions(*tables)
+            # cached_page checks its entries against these, so the body
+            # always matches the ETag
+            g.content_versions = versions
+            key = repr((request.endpoint, sorted(kwargs.items()), sorted(request.args.items(multi=True)), versions))
+            etag = hashlib.sha1(key.encode()).hexdigest()
+            stamps = [stamp for stamp in (_parse_timestamp(v[2]) for v in versions) if stamp]
+            last_modified = max(stamps) if stamps else None
+
+            # If-None-Match wins over If-Modified-Since when both are sent
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and last_modified <= request.if_modified_since)
+
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # A compressed body is a different byte sequence, so its tag is weak
+            response.set_etag(etag, weak='Content-Encoding' in response.headers)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
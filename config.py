@@ -0,0 +1,60 @@
+import os
+from dotenv import load_dotenv
+
+
+def _flag(value):
+    return value == '1'
+
+
+# config key -> (environment variable, parser). Keys left unset fall back to
+# each module's own default in its init_app.
+ENV_SETTINGS = {
+    'SECRET_KEY': ('TAMSA_SECRET_KEY', str),
+    'ADMIN_PASSWORD': ('ADMIN_PASSWORD', str),
+    'DATABASE': ('TAMSA_DB_PATH', str),
+    'DATABASE_POOL_SIZE': ('TAMSA_DB_POOL_SIZE', int),
+    'PAGE_CACHE_ENABLED': ('TAMSA_PAGE_CACHE', _flag),
+    'PAGE_CACHE_SIZE': ('TAMSA_PAGE_CACHE_SIZE', int),
+    'PAGE_CACHE_TTL': ('TAMSA_PAGE_CACHE_TTL', float),
+    'UPLOAD_SPOOL_DIR': ('TAMSA_UPLOAD_SPOOL_DIR', str),
+    'UPLOAD_WORKERS': ('TAMSA_UPLOAD_WORKERS', int),
+    'UPLOAD_BATCH_MAX': ('TAMSA_UPLOAD_BATCH_MAX', int),
+    'OUTBOX_POLL_INTERVAL': ('TAMSA_OUTBOX_POLL_INTERVAL', float),
+    'RECONCILE_INTERVAL': ('TAMSA_RECONCILE_INTERVAL', float),
+    'COMPRESS_RESPONSES': ('TAMSA_COMPRESS_RESPONSES', _flag),
+    'COMPRESS_MIN_SIZE': ('TAMSA_COMPRESS_MIN_SIZE', int),
+    'AUTO_MIGRATE': ('TAMSA_AUTO_MIGRATE', _flag),
+    'METRICS_ENABLED': ('TAMSA_METRICS', _flag),
+    'SLOW_QUERY_MS': ('TAMSA_SLOW_QUERY_MS', float),
+    'METRICS_DIR': ('TAMSA_METRICS_DIR', str),
+    'METRICS_TOKEN': ('TAMSA_METRICS_TOKEN', str),
+    'MEDIA_STORE': ('TAMSA_MEDIA_STORE', str),
+    'MEDIA_ROOT': ('TAMSA_MEDIA_ROOT', str),
+    'MEDIA_ACCEL_REDIRECT': ('TAMSA_MEDIA_ACCEL_REDIRECT', str),
+    'MEDIA_BUFFER_SIZE': ('TAMSA_MEDIA_BUFFER_SIZE', int),
+    'USE_X_SENDFILE': ('TAMSA_X_SENDFILE', _flag),
+    'CLOUDINARY_CLOUD_NAME': ('CLOUDINARY_CLOUD_NAME', str),
+    'CLOUDINARY_API_KEY': ('CLOUDINARY_API_KEY', str),
+    'CLOUDINARY_API_SECRET': ('CLOUDINARY_API_SECRET', str),
+    'CLOUDINARY_UPLOAD_PREFIX': ('CLOUDINARY_UPLOAD_PREFIX', str),
+}
+
+DEFAULTS = {
+    'SECRET_KEY': 'thebaddhshs',
+}
+
+
+def load_config(overrides=None):
+    """Read .env and the environment once into a config mapping.
+
+    Values already in the process environment win over .env, and
+    `overrides` win over both.
+    """
+    load_dotenv()
+    config = dict(DEFAULTS)
+    for key, (variable, parse) in ENV_SETTINGS.items():
+        value = os.environ.get(variable)
+        if value is not None:
+            config[key] = parse(value)
+    config.update(overrides or {})
+    return config
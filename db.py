@@ -0,0 +1,143 @@
+import queue
+import sqlite3
+import threading
+from flask import g, current_app, has_app_context
+import metrics
+
+DEFAULT_DB_PATH = 'tamsa.db'
+DEFAULT_POOL_SIZE = 8
+
+# Applied to every new connection. WAL lets readers run while the admin
+# dashboard is writing, and NORMAL sync is safe under WAL.
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA foreign_keys = ON',
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_local = threading.local()
+# Config of the app init_app saw last, for code running outside an app
+# context (CLI helpers, background threads)
+_config = {'DATABASE': DEFAULT_DB_PATH, 'DATABASE_POOL_SIZE': DEFAULT_POOL_SIZE}
+
+
+def connect(path=None):
+    """Open a new tuned connection to the database"""
+    conn = sqlite3.connect(path or _settings()['DATABASE'], timeout=5.0, check_same_thread=False,
+                           factory=metrics.connection_factory())
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class ConnectionPool:
+    """Keeps idle connections around so requests don't reconnect every time"""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect(self.path)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def get_pool(path=None):
+    """Return the shared pool for a database path, creating it on first use"""
+    path = path or _settings()['DATABASE']
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path, _settings()['DATABASE_POOL_SIZE'])
+    return pool
+
+
+def _settings():
+    return current_app.config if has_app_context() else _config
+
+
+def discard_inherited():
+    """Drop connections copied from a parent process by fork().
+
+    SQLite handles must not be used across fork; they are forgotten, not
+    closed, so the parent's locks are left alone.
+    """
+    global _local
+    with _pools_lock:
+        _pools.clear()
+    _local = threading.local()
+
+
+def warm_pool(count):
+    """Open up to `count` connections ahead of the first requests"""
+    pool = get_pool()
+    conns = [pool.acquire() for _ in range(min(count, pool.size))]
+    for conn in conns:
+        pool.release(conn)
+
+
+def get_db():
+    """Return the connection bound to the current request or thread.
+
+    Inside an app context the connection is checked out of the pool once and
+    handed back on teardown. Outside one (CLI commands, background workers)
+    each thread keeps its own connection.
+    """
+    if has_app_context():
+        if '_db_conn' not in g:
+            g._db_conn = get_pool().acquire()
+        return g._db_conn
+
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = _local.conn = connect()
+    return conn
+
+
+def close_db(exception=None):
+    """Return the request's connection to the pool"""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+def init_app(app):
+    """Register the database settings and teardown hook on the app"""
+    global _config
+    app.config.setdefault('DATABASE', DEFAULT_DB_PATH)
+    app.config.setdefault('DATABASE_POOL_SIZE', DEFAULT_POOL_SIZE)
+    _config = app.config
+    app.teardown_appcontext(close_db)
+
+
+def ensure_column(cur, table, column, declaration):
+    """Add a column to an existing table if an older database lacks it"""
+    columns = [row[1] for row in cur.execute(f'PRAGMA table_info({table})')]
+    if column not in columns:
+        cur.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
@@ -0,0 +1,45 @@
+from functools import lru_cache
+from media import get_store
+
+# Let Cloudinary pick the format (AVIF/WebP/JPEG) and compression per browser
+AUTO = {'fetch_format': 'auto', 'quality': 'auto'}
+
+# name -> (resource_type, file extension, transformation chain)
+PRESETS = {
+    'thumb': ('image', None, [{'width': 640, 'crop': 'limit'}, AUTO]),
+    'portrait': ('image', None, [{'width': 480, 'height': 480, 'crop': 'fill', 'gravity': 'auto'}, AUTO]),
+    'detail': ('image', None, [{'width': 1280, 'crop': 'limit'}, AUTO]),
+    'video_thumb': ('video', 'mp4', [{'width': 640, 'crop': 'limit', 'quality': 'auto'}]),
+    'video_detail': ('video', 'mp4', [{'width': 1280, 'crop': 'limit', 'quality': 'auto'}]),
+    # A still frame picked by Cloudinary, shown until the video is played
+    'poster_thumb': ('video', 'jpg', [{'start_offset': 'auto', 'width': 640, 'crop': 'limit'}, AUTO]),
+    'poster_detail': ('video', 'jpg', [{'start_offset': 'auto', 'width': 1280, 'crop': 'limit'}, AUTO]),
+}
+
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _delivery_url(public_id, preset):
+    resource_type, extension, transformation = PRESETS[preset]
+    return get_store().url_for(public_id, resource_type, transformation, extension)
+
+
+def delivery_url(public_id, preset, fallback=None):
+    """Sized, auto-format delivery URL for an uploaded asset.
+
+    Falls back to the stored original URL when there is no public_id yet,
+    Cloudinary is not configured or the media store has no such rendition.
+    """
+    if not public_id:
+        return fallback or ''
+    try:
+        return _delivery_url(public_id, preset) or fallback or ''
+    except ValueError:
+        return fallback or ''
+
+
+def init_app(app):
+    """Register delivery_url as a template filter"""
+    _delivery_url.cache_clear()
+    app.add_template_filter(delivery_url)
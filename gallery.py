@@ -0,0 +1,150 @@
+from flask import Blueprint, current_app, jsonify, request, session
+from db import get_db
+from records import GalleryItem, fetch_all
+from uploads import upload_queue, release_media
+from outbox import queue_deletions
+
+gallery_bp = Blueprint('gallery_bp', __name__)
+
+GALLERY_FOLDER = 'tamsa/activities'
+
+
+def create_gallery_table(cur):
+    """Create activity_media, the extra photos and videos of an activity.
+
+    Its writes bump the activities version so cached activity pages and
+    their ETags change when a gallery item finishes uploading.
+    """
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS activity_media (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    activity_id INTEGER NOT NULL REFERENCES activities(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    filename TEXT,
+    media_url TEXT,
+    media_public_id TEXT,
+    media_type TEXT NOT NULL,
+    media_status TEXT NOT NULL DEFAULT 'pending',
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (activity_id, position)
+    )
+    ''')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS activity_media_{event.lower()}_version AFTER {event} ON activity_media
+        BEGIN
+            UPDATE content_versions SET version = version + 1, updated_date = CURRENT_TIMESTAMP
+            WHERE table_name = 'activities';
+        END
+        ''')
+    # Per-file progress looks jobs up by the row they fill in
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_media_uploads_target ON media_uploads(target_table, target_id)')
+
+
+def add_gallery(cur, activity_id, items):
+    """Insert gallery rows for (filename, media_type, Spooled) items and
+    queue their uploads, inside the caller's transaction.
+
+    Returns the upload job ids to submit once committed.
+    """
+    if not items:
+        return []
+    cur.executemany('''
+        INSERT INTO activity_media (activity_id, position, filename, media_type)
+        VALUES (?, ?, ?, ?)
+    ''', [(activity_id, position, filename, media_type)
+          for position, (filename, media_type, _) in enumerate(items, start=1)])
+    cur.execute('SELECT id FROM activity_media WHERE activity_id = ? ORDER BY position', (activity_id,))
+    row_ids = [row[0] for row in cur.fetchall()]
+    return [upload_queue.add(cur, 'activity_media', row_id, spooled, media_type, GALLERY_FOLDER)
+            for row_id, (_, media_type, spooled) in zip(row_ids, items)]
+
+
+def release_gallery(cur, activity_ids):
+    """Remove the galleries of activities about to be deleted, queueing
+    media no other post shares for deletion"""
+    if not activity_ids:
+        return
+    placeholders = ', '.join('?' for _ in activity_ids)
+    cur.execute(f'''
+        SELECT media_public_id, media_type FROM activity_media
+        WHERE activity_id IN ({placeholders}) AND media_public_id IS NOT NULL
+    ''', tuple(activity_ids))
+    queue_deletions(cur, [(public_id, media_type) for public_id, media_type in cur.fetchall()
+                          if release_media(cur, public_id)])
+    cur.execute(f'DELETE FROM activity_media WHERE activity_id IN ({placeholders})', tuple(activity_ids))
+
+
+def load_galleries(conn, activity_ids):
+    """{activity_id: [GalleryItem]} for a page of activities, in one query"""
+    if not activity_ids:
+        return {}
+    placeholders = ', '.join('?' for _ in activity_ids)
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT {GalleryItem.select_list} FROM activity_media
+        WHERE activity_id IN ({placeholders}) ORDER BY activity_id, position
+    ''', tuple(activity_ids))
+    galleries = {}
+    for item in fetch_all(cur, GalleryItem):
+        galleries.setdefault(item.activity_id, []).append(item)
+    return galleries
+
+
+@gallery_bp.route('/admin/activities/<int:activity_id>/media')
+def media_status(activity_id):
+    """Upload progress of every file of an activity, cover first"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    cur = get_db().cursor()
+    cur.execute('''
+        SELECT 0, NULL, a.media_url, a.media_type, a.media_status, u.attempts, u.last_error
+        FROM activities a
+        LEFT JOIN media_uploads u ON u.target_table = 'activities' AND u.target_id = a.id
+        WHERE a.id = ?
+    ''', (activity_id,))
+    cover = cur.fetchone()
+    if cover is None:
+        return jsonify({'success': False, 'message': 'Activity not found'}), 404
+    cur.execute('''
+        SELECT m.position, m.filename, m.media_url, m.media_type, m.media_status, u.attempts, u.last_error
+        FROM activity_media m
+        LEFT JOIN media_uploads u ON u.target_table = 'activity_media' AND u.target_id = m.id
+        WHERE m.activity_id = ? ORDER BY m.position
+    ''', (activity_id,))
+    return _progress(([cover] if cover[3] else []) + cur.fetchall())
+
+
+@gallery_bp.route('/admin/documents/media')
+def documents_status():
+    """Upload progress of a batch of documents, ?ids=1,2,3"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i]
+    except ValueError:
+        return jsonify({'success': False, 'message': 'ids must be document ids'}), 400
+    ids = ids[:current_app.config['UPLOAD_BATCH_MAX']]
+    if not ids:
+        return jsonify({'success': False, 'message': 'ids must be document ids'}), 400
+
+    placeholders = ', '.join('?' for _ in ids)
+    cur = get_db().cursor()
+    cur.execute(f'''
+        SELECT d.filename, d.cloudinary_url, 'raw', d.media_status, u.attempts, u.last_error
+        FROM documents d
+        LEFT JOIN media_uploads u ON u.target_table = 'documents' AND u.target_id = d.id
+        WHERE d.id IN ({placeholders}) ORDER BY d.id
+    ''', tuple(ids))
+    return _progress([(position,) + row for position, row in enumerate(cur.fetchall(), start=1)])
+
+
+def _progress(rows):
+    """(position, filename, url, type, status, attempts, error) rows as JSON"""
+    files = [{'position': position, 'filename': filename, 'url': url or None, 'type': media_type,
+              'status': status, 'attempts': attempts or 0, 'error': error}
+             for position, filename, url, media_type, status, attempts, error in rows]
+    return jsonify({'success': True, 'files': files,
+                    'pending': sum(1 for f in files if f['status'] == 'pending')})
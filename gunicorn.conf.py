@@ -0,0 +1,83 @@
+"""Production server settings: gunicorn -c gunicorn.conf.py
+
+gunicorn reads this file on its own when started from the repository root.
+Every value can be overridden from the environment or the command line.
+
+Graceful reload: `kill -HUP <master pid>` starts workers on the new code
+and lets the old ones finish their in-flight requests.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import metrics_files
+
+wsgi_app = 'tamsa:create_app()'
+bind = os.getenv('TAMSA_BIND', '0.0.0.0:8000')
+
+# Threaded workers: page reads are short and mostly wait on SQLite or the
+# page cache, so a few threads per process keep every core busy without
+# the memory of one process per concurrent request
+worker_class = 'gthread'
+workers = int(os.getenv('TAMSA_WORKERS', multiprocessing.cpu_count() + 1))
+threads = int(os.getenv('TAMSA_THREADS', '4'))
+
+# A gthread worker keeps heartbeating while a thread streams a slow upload,
+# so `timeout` only reaps workers that are truly stuck; it is sized for the
+# largest single-request upload. Page reads release the connection after
+# a short keep-alive instead of holding a thread for an idle client.
+timeout = int(os.getenv('TAMSA_WORKER_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('TAMSA_GRACEFUL_TIMEOUT', '60'))
+keepalive = int(os.getenv('TAMSA_KEEPALIVE', '5'))
+
+# Recycle workers now and then so slow leaks can't build up
+max_requests = int(os.getenv('TAMSA_MAX_REQUESTS', '2000'))
+max_requests_jitter = max_requests // 10
+
+# Loading the app in the master saves memory, but HUP then keeps serving
+# the old code, so it is off unless asked for
+preload_app = os.getenv('TAMSA_PRELOAD', '0') == '1'
+
+if os.path.isdir('/dev/shm'):
+    # Heartbeat files on a disk-backed /tmp can stall workers under I/O load
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.getenv('TAMSA_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Workers publish their metrics here so /metrics on any of them covers all
+metrics_dir = os.environ.setdefault('TAMSA_METRICS_DIR',
+                                    os.path.join(tempfile.gettempdir(), f'tamsa-metrics-{os.getpid()}'))
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def on_exit(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def worker_exit(server, worker):
+    """Publish the final numbers of a worker that is shutting down"""
+    import metrics
+    if metrics.enabled:
+        metrics.registry.flush(metrics_dir, force=True)
+
+
+def child_exit(server, worker):
+    """Keep an exited worker's totals in the archive and drop its file"""
+    metrics_files.retire_worker(metrics_dir, worker.pid)
+
+
+def post_fork(server, worker):
+    """Start each worker without the parent's SQLite handles"""
+    import db
+    db.discard_inherited()
+
+
+def post_worker_init(worker):
+    """Open this worker's connections and start its background workers"""
+    import db
+    import tamsa
+    app = worker.wsgi
+    with app.app_context():
+        db.warm_pool(threads)
+    tamsa.start_workers(app)
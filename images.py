@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, url_for
+from markupsafe import Markup, escape
+
+VARIANT_DIR = 'variants'
+MANIFEST_NAME = 'manifest.json'
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+VARIANT_WIDTHS = (160, 320, 480, 640, 960, 1280)
+# Best first; the last one is the <img> fallback every browser can show
+FORMATS = ('avif', 'webp', 'fallback')
+QUALITY = {'avif': 50, 'webp': 75, 'jpeg': 80}
+# Bump when the widths or encoder settings change so old variants are redone
+PIPELINE_VERSION = '1'
+
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+_manifest = None
+
+
+def _variant_dir(static_folder):
+    return os.path.join(static_folder, VARIANT_DIR)
+
+
+def _source_digest(path):
+    digest = hashlib.sha256(PIPELINE_VERSION.encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def _render(path, digest, out_dir):
+    """Encode every width and format of one source image (runs in a worker process)"""
+    from PIL import Image, ImageOps, features
+
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    fallback = 'png' if has_alpha else 'jpeg'
+    formats = [f for f in ('avif', 'webp') if features.check(f)] + [fallback]
+    widths = [w for w in VARIANT_WIDTHS if w < image.width] + [image.width]
+    stem = os.path.splitext(os.path.basename(path))[0].replace(' ', '-')
+
+    variants = {}
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            name = f'{stem}-{width}.{digest}.{"jpg" if fmt == "jpeg" else fmt}'
+            options = {'optimize': True} if fmt == 'png' else {'quality': QUALITY[fmt]}
+            if fmt == 'jpeg':
+                options['progressive'] = True
+            resized.save(os.path.join(out_dir, name), fmt.upper(), **options)
+            variants.setdefault('fallback' if fmt == fallback else fmt, []).append([width, name])
+
+    return {
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'fallback_type': fallback,
+        'variants': variants,
+    }
+
+
+def _is_current(entry, digest, out_dir):
+    if not entry or entry.get('hash') != digest:
+        return False
+    return all(os.path.exists(os.path.join(out_dir, name))
+               for files in entry['variants'].values() for _, name in files)
+
+
+def build_variants(static_folder, workers=None):
+    """Generate resized variants for every image in static/.
+
+    Sources whose content hash matches the manifest and whose files are all
+    on disk are skipped. Returns (generated, skipped) counts.
+    """
+    out_dir = _variant_dir(static_folder)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+
+    manifest = {}
+    pending = {}
+    for filename in sorted(os.listdir(static_folder)):
+        path = os.path.join(static_folder, filename)
+        if not os.path.isfile(path) or not filename.lower().endswith(SOURCE_EXTENSIONS):
+            continue
+        digest = _source_digest(path)
+        if _is_current(previous.get(filename), digest, out_dir):
+            manifest[filename] = previous[filename]
+        else:
+            pending[filename] = (path, digest)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {filename: pool.submit(_render, path, digest, out_dir)
+                       for filename, (path, digest) in pending.items()}
+            for filename, future in futures.items():
+                manifest[filename] = future.result()
+
+    # Drop variants of images that changed or were removed
+    keep = {name for entry in manifest.values() for files in entry['variants'].values() for _, name in files}
+    for name in os.listdir(out_dir):
+        if name != MANIFEST_NAME and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+    global _manifest
+    _manifest = manifest
+    return len(pending), len(manifest) - len(pending)
+
+
+def _entry(filename):
+    global _manifest
+    if _manifest is None:
+        path = os.path.join(_variant_dir(current_app.static_folder), MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            current_app.logger.warning('No image variants found, run "flask build-images"')
+            _manifest = {}
+    return _manifest.get(filename)
+
+
+def _variant_url(name):
+    return url_for('static', filename=f'{VARIANT_DIR}/{name}')
+
+
+def image_srcset(filename, fmt='webp'):
+    """srcset value for one format of a static image, or '' if not built"""
+    entry = _entry(filename)
+    if not entry:
+        return ''
+    files = entry['variants'].get(fmt) or entry['variants']['fallback']
+    return ', '.join(f'{_variant_url(name)} {width}w' for width, name in files)
+
+
+def image_url(filename, width=None, fmt='fallback'):
+    """URL of the smallest variant at least `width` wide (the largest if no
+    width is given), or of the original if variants were not built"""
+    entry = _entry(filename)
+    if not entry:
+        return url_for('static', filename=filename)
+    files = entry['variants'].get(fmt) or entry['variants']['fallback']
+    if width is not None:
+        for variant_width, name in files:
+            if variant_width >= width:
+                return _variant_url(name)
+    return _variant_url(files[-1][1])
+
+
+def _attributes(attrs):
+    return ''.join(f' {key.replace("_", "-")}="{escape(value)}"' for key, value in attrs.items())
+
+
+def responsive_image(filename, alt='', sizes='100vw', **attrs):
+    """<picture> with AVIF/WebP sources and a JPEG/PNG <img> fallback"""
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    entry = _entry(filename)
+    if not entry:
+        return Markup(f'<img src="{escape(url_for("static", filename=filename))}" alt="{escape(alt)}"{_attributes(attrs)}>')
+
+    attrs.setdefault('width', entry['width'])
+    attrs.setdefault('height', entry['height'])
+    extra = _attributes(attrs)
+    sources = ''.join(
+        f'<source type="{MIME_TYPES[fmt]}" srcset="{escape(image_srcset(filename, fmt))}" sizes="{escape(sizes)}">'
+        for fmt in FORMATS[:-1] if fmt in entry['variants']
+    )
+    fallback = (f'<img src="{escape(image_url(filename, 640))}" srcset="{escape(image_srcset(filename, "fallback"))}" '
+                f'sizes="{escape(sizes)}" alt="{escape(alt)}"{extra}>')
+    return Markup(f'<picture>{sources}{fallback}</picture>')
+
+
+def init_app(app):
+    """Expose the image helpers to templates"""
+    app.jinja_env.globals.update(
+        responsive_image=responsive_image,
+        image_srcset=image_srcset,
+        image_url=image_url,
+    )
@@ -0,0 +1,369 @@
+import calendar
+import importlib
+import mimetypes
+import os
+import shutil
+import stat
+import threading
+import time
+import unicodedata
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import Blueprint, abort, current_app, make_response, redirect, request
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
+from werkzeug.utils import secure_filename
+from db import get_db
+from records import Document, fetch_one
+
+DEFAULT_STORE = 'cloudinary'
+DEFAULT_MEDIA_ROOT = os.path.join('uploads', 'media')
+MEDIA_URL_PREFIX = '/media'
+RESOURCE_TYPES = ('image', 'video', 'raw')
+# Read size when the server can't send files itself
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+media_bp = Blueprint('media_bp', __name__)
+
+UploadResult = namedtuple('UploadResult', ['url', 'public_id'])
+# `created` is a Unix timestamp
+StoredResource = namedtuple('StoredResource', ['public_id', 'created'])
+
+
+class MediaStore:
+    """Where uploaded media lives.
+
+    public_ids are the store's own names for assets and are what the
+    database keeps; urls are what pages link to.
+    """
+
+    def upload(self, path, resource_type, folder):
+        """Store a local file; returns an UploadResult"""
+        raise NotImplementedError
+
+    def upload_large(self, path, resource_type, folder):
+        """Like upload, for files big enough to need chunking"""
+        return self.upload(path, resource_type, folder)
+
+    def destroy(self, public_id, resource_type):
+        """Remove one asset; returns 'deleted', 'not_found' or an error"""
+        return self.destroy_batch([public_id], resource_type).get(public_id, 'Not deleted')
+
+    def destroy_batch(self, public_ids, resource_type):
+        """Remove several assets of one type; returns {public_id: outcome}"""
+        raise NotImplementedError
+
+    def list(self, prefix, resource_type):
+        """Yield a StoredResource for every asset under prefix"""
+        raise NotImplementedError
+
+    def url_for(self, public_id, resource_type='image', transformation=None, format=None):
+        """Delivery URL, or None if the store can't produce that rendition"""
+        raise NotImplementedError
+
+
+class CloudinaryStore(MediaStore):
+    """Cloudinary, with the SDK imported and configured on first use.
+
+    The SDK's module-level HTTP pools keep one connection per host, so
+    concurrent upload workers would reconnect on every call; they are
+    replaced with one shared pool large enough for all of them.
+    """
+
+    BATCH_SIZE = 100  # Cloudinary's limit for delete_resources
+
+    def __init__(self, settings, pool_size=4):
+        self.settings = {k: v for k, v in settings.items() if v is not None}
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._configured = False
+
+    def _sdk(self, name):
+        module = importlib.import_module(name)
+        if not self._configured:
+            with self._lock:
+                if not self._configured:
+                    self._configure()
+                    self._configured = True
+        return module
+
+    def _configure(self):
+        import cloudinary
+        import cloudinary.uploader
+        import cloudinary.api_client.call_api
+        from cloudinary.utils import get_http_connector
+        cloudinary.config(**self.settings)
+        connector = get_http_connector(cloudinary.config(),
+                                       dict(cloudinary.CERT_KWARGS, maxsize=self.pool_size))
+        cloudinary.uploader._http = connector
+        cloudinary.api_client.call_api._http = connector
+
+    def upload(self, path, resource_type, folder):
+        result = self._sdk('cloudinary.uploader').upload(
+            path, resource_type=resource_type, folder=folder, use_filename=True)
+        return UploadResult(result['secure_url'], result['public_id'])
+
+    def upload_large(self, path, resource_type, folder):
+        # Chunked, so a dropped connection only repeats one part
+        result = self._sdk('cloudinary.uploader').upload_large(
+            path, resource_type=resource_type, folder=folder, use_filename=True)
+        return UploadResult(result['secure_url'], result['public_id'])
+
+    def destroy(self, public_id, resource_type):
+        result = self._sdk('cloudinary.uploader').destroy(public_id, resource_type=resource_type)
+        return {'ok': 'deleted', 'not found': 'not_found'}.get(result.get('result'), result.get('result'))
+
+    def destroy_batch(self, public_ids, resource_type):
+        api = self._sdk('cloudinary.api')
+        outcome = {}
+        for start in range(0, len(public_ids), self.BATCH_SIZE):
+            result = api.delete_resources(public_ids[start:start + self.BATCH_SIZE], resource_type=resource_type)
+            outcome.update(result.get('deleted', {}))
+        return outcome
+
+    def list(self, prefix, resource_type):
+        api = self._sdk('cloudinary.api')
+        options = {'type': 'upload', 'prefix': prefix, 'resource_type': resource_type, 'max_results': 500}
+        while True:
+            listing = api.resources(**options)
+            for resource in listing.get('resources', []):
+                created = calendar.timegm(time.strptime(resource['created_at'], '%Y-%m-%dT%H:%M:%SZ'))
+                yield StoredResource(resource['public_id'], created)
+            options['next_cursor'] = listing.get('next_cursor')
+            if not options['next_cursor']:
+                break
+
+    def url_for(self, public_id, resource_type='image', transformation=None, format=None):
+        options = {'secure': True, 'resource_type': resource_type}
+        if transformation:
+            options['transformation'] = transformation
+        if format:
+            options['format'] = format
+        return self._sdk('cloudinary.utils').cloudinary_url(public_id, **options)[0]
+
+
+class LocalStore(MediaStore):
+    """Files under a local directory, served from /media.
+
+    Laid out as <root>/<resource_type>/<public_id>. There are no
+    transformations, so renditions in another format are unavailable and
+    templates fall back to the original.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, public_id, resource_type):
+        path = safe_join(os.path.abspath(self.root), resource_type, public_id)
+        if path is None:
+            raise ValueError(f'Invalid public_id: {public_id}')
+        return path
+
+    def upload(self, path, resource_type, folder):
+        stem, extension = os.path.splitext(secure_filename(os.path.basename(path)) or 'upload')
+        public_id = f'{folder}/{stem}_{uuid.uuid4().hex[:8]}{extension.lower()}'
+        target = self.path(public_id, resource_type)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target + '.tmp')
+        os.replace(target + '.tmp', target)
+        return UploadResult(self.url_for(public_id, resource_type), public_id)
+
+    def destroy_batch(self, public_ids, resource_type):
+        outcome = {}
+        for public_id in public_ids:
+            try:
+                os.remove(self.path(public_id, resource_type))
+                outcome[public_id] = 'deleted'
+            except FileNotFoundError:
+                outcome[public_id] = 'not_found'
+            except (OSError, ValueError) as e:
+                outcome[public_id] = str(e)
+        return outcome
+
+    def list(self, prefix, resource_type):
+        base = os.path.join(os.path.abspath(self.root), resource_type)
+        for directory, _, files in os.walk(base):
+            for name in files:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(directory, name)
+                public_id = os.path.relpath(path, base).replace(os.sep, '/')
+                if public_id.startswith(prefix):
+                    yield StoredResource(public_id, os.path.getmtime(path))
+
+    def url_for(self, public_id, resource_type='image', transformation=None, format=None):
+        if format and not public_id.lower().endswith('.' + format):
+            return None
+        return f'{MEDIA_URL_PREFIX}/{resource_type}/{quote(public_id)}'
+
+
+_store = None
+
+
+def get_store():
+    """The configured MediaStore (usable outside a request)"""
+    return _store
+
+
+def _disposition(as_attachment, download_name):
+    kind = 'attachment' if as_attachment else 'inline'
+    try:
+        download_name.encode('ascii')
+        return kind, {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return kind, {'filename': simple, 'filename*': "UTF-8''" + quote(download_name, safe='!#$&+^`|~')}
+
+
+def _if_range_matches(if_range, etag, modified):
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return modified <= if_range.date
+    return True
+
+
+def _read_span(file, length, buffer_size):
+    try:
+        while length > 0:
+            chunk = file.read(min(buffer_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def send_media(path, mimetype=None, download_name=None, as_attachment=False, max_age=None):
+    """Stream a local file, answering Range and conditional requests.
+
+    Only the requested span is read, one buffer at a time. A whole file is
+    handed to the server's wsgi.file_wrapper so gunicorn can send it with
+    sendfile(); partial content never is, as most wrappers stream to EOF
+    whatever the Content-Length. With USE_X_SENDFILE the front-end server
+    sends it.
+    """
+    try:
+        info = os.stat(path)
+    except (OSError, ValueError):
+        abort(404)
+    if not stat.S_ISREG(info.st_mode):
+        abort(404)
+    size = info.st_size
+    etag = f'{info.st_mtime_ns:x}-{size:x}'
+    modified = datetime.fromtimestamp(int(info.st_mtime), timezone.utc)
+
+    response = current_app.response_class(
+        mimetype=mimetype or mimetypes.guess_type(download_name or path)[0] or 'application/octet-stream',
+        direct_passthrough=True)
+    response.set_etag(etag)
+    response.last_modified = modified
+    response.accept_ranges = 'bytes'
+    response.cache_control.public = True
+    if max_age is not None:
+        response.cache_control.max_age = max_age
+    if download_name:
+        kind, options = _disposition(as_attachment, download_name)
+        response.headers.set('Content-Disposition', kind, **options)
+
+    if not is_resource_modified(request.environ, etag, last_modified=modified):
+        response.status_code = 304
+        return response
+    if current_app.config['USE_X_SENDFILE']:
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.content_length = size
+        return response
+
+    start, length = 0, size
+    byte_range = request.range
+    # Several ranges at once are rare (multipart); send the whole file instead
+    if (byte_range is not None and byte_range.units == 'bytes' and len(byte_range.ranges) == 1
+            and _if_range_matches(request.if_range, etag, modified)):
+        span = byte_range.range_for_length(size)
+        if span is None:
+            response.status_code = 416
+            response.headers['Content-Range'] = f'bytes */{size}'
+            response.content_length = 0
+            return response
+        start, length = span[0], span[1] - span[0]
+        response.status_code = 206
+        response.headers['Content-Range'] = f'bytes {span[0]}-{span[1] - 1}/{size}'
+    response.content_length = length
+    if request.method == 'HEAD':
+        return response
+
+    file = open(path, 'rb')
+    file.seek(start)
+    buffer_size = current_app.config['MEDIA_BUFFER_SIZE']
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and response.status_code != 206:
+        response.response = file_wrapper(file, buffer_size)
+    else:
+        response.response = _read_span(file, length, buffer_size)
+    return response
+
+
+@media_bp.route(f'{MEDIA_URL_PREFIX}/<resource_type>/<path:public_id>')
+def serve(resource_type, public_id):
+    """Serve a locally stored asset, or hand it to the front-end server"""
+    if not isinstance(_store, LocalStore) or resource_type not in RESOURCE_TYPES:
+        abort(404)
+    try:
+        path = _store.path(public_id, resource_type)
+    except ValueError:
+        abort(404)
+    accel = current_app.config['MEDIA_ACCEL_REDIRECT']
+    if accel:
+        # nginx serves the file itself, with ranges and sendfile
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = f'{accel.rstrip("/")}/{resource_type}/{quote(public_id)}'
+        response.mimetype = mimetypes.guess_type(public_id)[0] or 'application/octet-stream'
+        return response
+    return send_media(path, max_age=current_app.config['MEDIA_MAX_AGE'])
+
+
+@media_bp.route('/documents/<int:doc_id>/download')
+def download_document(doc_id):
+    """A document under its original filename (?download=1 saves it instead
+    of opening it); documents held remotely redirect to the store"""
+    cur = get_db().cursor()
+    cur.execute(f'SELECT {Document.select_list} FROM documents WHERE id = ?', (doc_id,))
+    doc = fetch_one(cur, Document)
+    if doc is None or not doc.url:
+        abort(404)
+    local = isinstance(_store, LocalStore) and doc.url.startswith(MEDIA_URL_PREFIX + '/')
+    if not local or current_app.config['MEDIA_ACCEL_REDIRECT']:
+        return redirect(doc.url)
+    try:
+        path = _store.path(doc.public_id, 'raw')
+    except ValueError:
+        abort(404)
+    return send_media(path, 'application/pdf', download_name=doc.filename,
+                      as_attachment=request.args.get('download') == '1',
+                      max_age=current_app.config['MEDIA_MAX_AGE'])
+
+
+def init_app(app):
+    """Pick the media store for this deployment (MEDIA_STORE: cloudinary or local)"""
+    global _store
+    kind = app.config.setdefault('MEDIA_STORE', DEFAULT_STORE)
+    root = app.config.setdefault('MEDIA_ROOT', DEFAULT_MEDIA_ROOT)
+    app.config.setdefault('MEDIA_ACCEL_REDIRECT', None)
+    # Stored files never change under a public_id
+    app.config.setdefault('MEDIA_MAX_AGE', 30 * 24 * 3600)
+    app.config.setdefault('MEDIA_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+    if kind == 'local':
+        _store = LocalStore(root)
+    elif kind == 'cloudinary':
+        _store = CloudinaryStore({
+            'cloud_name': app.config.setdefault('CLOUDINARY_CLOUD_NAME', None),
+            'api_key': app.config.setdefault('CLOUDINARY_API_KEY', None),
+            'api_secret': app.config.setdefault('CLOUDINARY_API_SECRET', None),
+            # Points the upload and admin APIs elsewhere, e.g. the benchmark stub
+            'upload_prefix': app.config.setdefault('CLOUDINARY_UPLOAD_PREFIX', None),
+        }, pool_size=app.config.get('UPLOAD_WORKERS', 4))
+    else:
+        raise ValueError(f'Unknown MEDIA_STORE: {kind}')
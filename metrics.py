@@ -0,0 +1,325 @@
+import ipaddress
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, current_app, request, before_render_template, template_rendered
+from metrics_files import as_snapshot, merge_snapshots, read_snapshots, write_snapshot
+
+DEFAULT_ENABLED = True
+DEFAULT_SLOW_QUERY_MS = 100.0
+DEFAULT_METRICS_DIR = None
+# How often a worker publishes its numbers for the others to merge
+FLUSH_INTERVAL = 5.0
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+PHASES = ('db', 'template', 'remote')
+
+slow_query_log = logging.getLogger('tamsa.sql')
+
+enabled = DEFAULT_ENABLED
+slow_query_seconds = DEFAULT_SLOW_QUERY_MS / 1000
+_local = threading.local()
+
+
+class Registry:
+    """Counters and histograms in the Prometheus text format.
+
+    Each process keeps its own numbers. With a metrics directory set
+    (gunicorn does this), workers publish snapshots there and any worker
+    answering /metrics reports the sum over all of them; other workers'
+    figures may lag by up to FLUSH_INTERVAL. When a worker exits the master
+    folds its snapshot into an archive (metrics_files.retire_worker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}        # name -> (type, help, label names, buckets)
+        self._counters = {}    # name -> {labels: value}
+        self._histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+        self._last_flush = 0.0
+
+    def counter(self, name, help, labels=()):
+        self._meta[name] = ('counter', help, labels, None)
+        self._counters[name] = {}
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help, labels, buckets)
+        self._histograms[name] = {}
+
+    def inc(self, name, labels=(), amount=1):
+        series = self._counters[name]
+        with self._lock:
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name, value, labels=()):
+        buckets = self._meta[name][3]
+        series = self._histograms[name]
+        with self._lock:
+            entry = series.get(labels)
+            if entry is None:
+                entry = series[labels] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return as_snapshot(self._counters, self._histograms)
+
+    def flush(self, directory, force=False):
+        """Publish this process's snapshot, at most every FLUSH_INTERVAL"""
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        write_snapshot(directory, f'{os.getpid()}.json', self.snapshot())
+
+    def collect(self, directory=None):
+        """Merged snapshots: this process only, or every file in directory"""
+        if not directory:
+            return [self.snapshot()]
+        self.flush(directory, force=True)
+        return read_snapshots(directory)
+
+    def render(self, directory=None):
+        counters, histograms = merge_snapshots(self.collect(directory))
+
+        lines = []
+        for name, (kind, help, label_names, buckets) in self._meta.items():
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for labels, value in sorted(counters.get(name, {}).items()):
+                    lines.append(f'{name}{_labels(label_names, labels)} {_number(value)}')
+                continue
+            for labels, values in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(buckets, values):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(label_names + ("le",), labels + (_number(bound),))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(label_names + ("le",), labels + ("+Inf",))} {values[-1]}')
+                lines.append(f'{name}_sum{_labels(label_names, labels)} {_number(values[-2])}')
+                lines.append(f'{name}_count{_labels(label_names, labels)} {values[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+registry.counter('tamsa_requests_total', 'Requests handled', ('endpoint', 'method', 'status'))
+registry.histogram('tamsa_request_duration_seconds', 'Time from routing to response', ('endpoint', 'method'))
+registry.counter('tamsa_request_phase_seconds_total', 'Request time spent per phase', ('endpoint', 'phase'))
+registry.histogram('tamsa_db_queries_per_request', 'SQLite statements run by one request', ('endpoint',),
+                   buckets=QUERY_COUNT_BUCKETS)
+registry.histogram('tamsa_db_query_duration_seconds', 'Time per SQLite statement')
+registry.counter('tamsa_db_slow_queries_total', 'SQLite statements slower than the slow-query threshold')
+registry.histogram('tamsa_remote_duration_seconds', 'Time per Cloudinary API call', ('operation',))
+registry.counter('tamsa_remote_errors_total', 'Failed Cloudinary API calls', ('operation',))
+
+
+class RequestTimings:
+    __slots__ = ('start', 'db', 'template', 'remote', 'queries', 'template_start')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = self.template = self.remote = 0.0
+        self.queries = 0
+        self.template_start = None
+
+
+def _current():
+    return getattr(_local, 'timings', None)
+
+
+def record_query(sql, elapsed):
+    """Account one executed statement to the current request and the totals"""
+    timings = _current()
+    if timings is not None:
+        timings.db += elapsed
+        timings.queries += 1
+    registry.observe('tamsa_db_query_duration_seconds', elapsed)
+    if elapsed >= slow_query_seconds:
+        registry.inc('tamsa_db_slow_queries_total')
+        slow_query_log.warning('Slow query (%.1f ms): %s', elapsed * 1000, ' '.join(sql.split()))
+
+
+def record_fetch(elapsed):
+    """Row stepping after execute() counts as DB time but not as a query"""
+    timings = _current()
+    if timings is not None:
+        timings.db += elapsed
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_query(sql, time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            record_fetch(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            record_fetch(time.perf_counter() - start)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection whose statements feed the query metrics"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    return TimedConnection if enabled else sqlite3.Connection
+
+
+@contextmanager
+def timed_remote(operation):
+    """Time a Cloudinary API call, e.g. `with timed_remote('upload'):`"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        registry.inc('tamsa_remote_errors_total', (operation,))
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('tamsa_remote_duration_seconds', elapsed, (operation,))
+        timings = _current()
+        if timings is not None:
+            timings.remote += elapsed
+
+
+def _begin_request():
+    _local.timings = RequestTimings()
+
+
+def _template_started(sender, template, context, **extra):
+    timings = _current()
+    if timings is not None and timings.template_start is None:
+        timings.template_start = time.perf_counter()
+
+
+def _template_finished(sender, template, context, **extra):
+    timings = _current()
+    if timings is not None and timings.template_start is not None:
+        timings.template += time.perf_counter() - timings.template_start
+        timings.template_start = None
+
+
+def _finish_request(response):
+    timings = _current()
+    if timings is None:
+        return response
+    total = time.perf_counter() - timings.start
+    endpoint = request.endpoint or '<unmatched>'
+    registry.inc('tamsa_requests_total', (endpoint, request.method, str(response.status_code)))
+    registry.observe('tamsa_request_duration_seconds', total, (endpoint, request.method))
+    registry.observe('tamsa_db_queries_per_request', timings.queries, (endpoint,))
+    for phase in PHASES:
+        spent = getattr(timings, phase)
+        if spent:
+            registry.inc('tamsa_request_phase_seconds_total', (endpoint, phase), spent)
+
+    if current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = ', '.join((
+            f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template * 1000:.2f}',
+            f'remote;dur={timings.remote * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ))
+    return response
+
+
+def _end_request(exception=None):
+    _local.timings = None
+    directory = current_app.config['METRICS_DIR']
+    if directory:
+        registry.flush(directory)
+
+
+def _is_local_request():
+    """A direct connection from this machine, not one relayed by a proxy"""
+    if request.headers.get('X-Forwarded-For') or request.headers.get('Forwarded'):
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def metrics_view():
+    """Prometheus scrape endpoint: bearer token, or localhost without one"""
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', 401, mimetype='text/plain')
+    elif not _is_local_request():
+        return Response('Set TAMSA_METRICS_TOKEN to scrape metrics remotely\n', 403, mimetype='text/plain')
+    body = registry.render(current_app.config['METRICS_DIR'])
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Time DB, template and Cloudinary work per request and serve /metrics"""
+    global enabled, slow_query_seconds
+    enabled = app.config.setdefault('METRICS_ENABLED', DEFAULT_ENABLED)
+    slow_query_seconds = app.config.setdefault('SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS) / 1000
+    app.config.setdefault('SERVER_TIMING', True)
+    app.config.setdefault('METRICS_DIR', DEFAULT_METRICS_DIR)
+    app.config.setdefault('METRICS_TOKEN', None)
+    if not enabled:
+        return
+    if app.config['METRICS_DIR']:
+        os.makedirs(app.config['METRICS_DIR'], exist_ok=True)
+
+    app.before_request(_begin_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
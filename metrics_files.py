@@ -0,0 +1,111 @@
+"""Per-worker metric snapshots shared through a directory.
+
+Only the standard library is used here, so the gunicorn master can import
+this once at start-up and fold exited workers from its signal handler.
+"""
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no gunicorn on Windows either
+    fcntl = None
+
+# Totals of workers that have exited, so counters never go backwards
+ARCHIVE_FILE = 'archive.json'
+
+_exited = []
+_retiring = False
+
+
+@contextmanager
+def _directory_lock(directory, exclusive):
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def as_snapshot(counters, histograms):
+    """{name: {labels: value}} series in the JSON-friendly snapshot format"""
+    return {
+        'counters': {name: [[list(k), v] for k, v in s.items()] for name, s in counters.items()},
+        'histograms': {name: [[list(k), list(v)] for k, v in s.items()] for name, s in histograms.items()},
+    }
+
+
+def merge_snapshots(snapshots):
+    """Sum snapshots into ({name: {labels: value}}, {name: {labels: [..]}})"""
+    counters, histograms = {}, {}
+    for snapshot in snapshots:
+        for name, series in snapshot['counters'].items():
+            merged = counters.setdefault(name, {})
+            for labels, value in series:
+                merged[tuple(labels)] = merged.get(tuple(labels), 0) + value
+        for name, series in snapshot['histograms'].items():
+            merged = histograms.setdefault(name, {})
+            for labels, values in series:
+                current = merged.setdefault(tuple(labels), [0] * len(values))
+                merged[tuple(labels)] = [a + b for a, b in zip(current, values)]
+    return counters, histograms
+
+
+def write_snapshot(directory, name, snapshot):
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(path + '.tmp', path)
+
+
+def _load(directory, names):
+    snapshots = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def read_snapshots(directory):
+    """Every live worker's snapshot plus the archive"""
+    with _directory_lock(directory, exclusive=False):
+        return _load(directory, [name for name in os.listdir(directory) if name.endswith('.json')])
+
+
+def retire_worker(directory, pid):
+    """Fold an exited worker's last snapshot into the archive.
+
+    Called from the master's SIGCHLD handling, which can interrupt itself:
+    a nested call only queues its pid for the outer one, which would
+    otherwise deadlock on its own lock.
+    """
+    global _retiring
+    _exited.append(pid)
+    if _retiring:
+        return
+    _retiring = True
+    try:
+        while _exited:
+            _retire(directory, _exited.pop())
+    finally:
+        _retiring = False
+
+
+def _retire(directory, pid):
+    # The lock keeps a concurrent /metrics from counting the worker both in
+    # the archive and in its own file
+    name = f'{pid}.json'
+    with _directory_lock(directory, exclusive=True):
+        if not os.path.exists(os.path.join(directory, name)):
+            return
+        merged = merge_snapshots(_load(directory, [ARCHIVE_FILE, name]))
+        write_snapshot(directory, ARCHIVE_FILE, as_snapshot(*merged))
+        os.remove(os.path.join(directory, name))
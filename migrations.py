@@ -0,0 +1,285 @@
+from flask import current_app
+from werkzeug.security import generate_password_hash
+from db import get_db, ensure_column
+from conditional import create_version_triggers, CONTENT_TABLES
+from uploads import create_upload_tables
+from resumable import create_resumable_tables
+from outbox import create_outbox_tables, create_schedule_table
+from search import create_search_index
+from gallery import create_gallery_table
+
+DEFAULT_AUTO_MIGRATE = False
+# Initial admin password for a fresh database; change it from the dashboard
+DEFAULT_ADMIN_PASSWORD = 'admin1234'
+
+_schema_ready = False
+
+
+def create_base_tables(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS users(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fullname TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL
+    )
+    ''')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS documents(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    category TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    cloudinary_url TEXT NOT NULL,
+    cloudinary_public_id TEXT NOT NULL,
+    uploader TEXT NOT NULL,
+    upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS activities(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    date TEXT NOT NULL,
+    location TEXT NOT NULL,
+    media_url TEXT,
+    media_public_id TEXT,
+    media_type TEXT, -- 'image' or 'video'
+    author TEXT NOT NULL,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS leaders(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    position TEXT NOT NULL,
+    picture_url TEXT NOT NULL,
+    picture_public_id TEXT NOT NULL,
+    bio TEXT,
+    order_index INTEGER DEFAULT 0,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS opportunities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    type TEXT NOT NULL, -- 'opportunity' or 'announcement'
+    deadline TEXT, -- For opportunities
+    event_date TEXT, -- For announcements/events
+    location TEXT,
+    media_url TEXT,
+    media_public_id TEXT,
+    media_type TEXT,  --'image' or 'video'
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS admin_settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    setting_key TEXT UNIQUE NOT NULL,
+    setting_value TEXT NOT NULL,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def create_listing_indexes(cur):
+    """Back each listing's sort key with an index so a page is a range scan"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_documents_upload_date ON documents(upload_date DESC, id DESC)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_opportunities_created_date ON opportunities(created_date DESC, id DESC)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_activities_created_date ON activities(created_date DESC, id DESC)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_leaders_order ON leaders(order_index, created_date DESC, id DESC)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_leaders_created_date ON leaders(created_date DESC, id DESC)')
+
+
+def seed_admin_password(cur):
+    """Store the initial admin password from the ADMIN_PASSWORD setting"""
+    cur.execute('SELECT setting_value FROM admin_settings WHERE setting_key = ?', ('admin_password',))
+    if not cur.fetchone():
+        default_password = current_app.config['ADMIN_PASSWORD']
+        cur.execute('INSERT INTO admin_settings (setting_key, setting_value) VALUES (?, ?)',
+                    ('admin_password', generate_password_hash(default_password)))
+
+
+def add_opportunity_author(cur):
+    ensure_column(cur, 'opportunities', 'author', 'TEXT')
+
+
+def add_archived_flag(cur):
+    """Archived posts stay in the admin feed but leave public listings"""
+    for table in CONTENT_TABLES:
+        ensure_column(cur, table, 'archived', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def add_modified_dates(cur):
+    """Stamp every insert and update with modified_date, for API deltas.
+
+    Triggers keep it current whatever the writer (upload completion,
+    archiving, re-categorising), with millisecond precision so the API's
+    (modified_date, id) cursor rarely has to break ties.
+    """
+    created = {'documents': 'upload_date'}
+    now = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+    for table in CONTENT_TABLES:
+        ensure_column(cur, table, 'modified_date', 'TIMESTAMP')
+        cur.execute(f'UPDATE {table} SET modified_date = {created.get(table, "created_date")} '
+                    'WHERE modified_date IS NULL')
+        cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_modified_date ON {table}(modified_date, id)')
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_modified_insert AFTER INSERT ON {table}
+        WHEN new.modified_date IS NULL
+        BEGIN
+            UPDATE {table} SET modified_date = {now} WHERE id = new.id;
+        END
+        ''')
+        # Writers that set modified_date themselves are left alone, which
+        # also keeps the trigger from re-firing on its own update
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_modified_update AFTER UPDATE ON {table}
+        WHEN new.modified_date IS old.modified_date
+        BEGIN
+            UPDATE {table} SET modified_date = {now} WHERE id = new.id;
+        END
+        ''')
+
+
+
+def create_filter_indexes(cur):
+    """Let the category and type filters page through their own index range"""
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category, upload_date DESC, id DESC)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_opportunities_type ON opportunities(type, created_date DESC, id DESC)')
+
+
+def create_deletion_log(cur):
+    """Record every deleted post so API deltas can report it"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS deleted_posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    post_id INTEGER NOT NULL,
+    deleted_date TIMESTAMP NOT NULL
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_deleted_posts ON deleted_posts(table_name, deleted_date)')
+    for table in CONTENT_TABLES:
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_deleted AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO deleted_posts (table_name, post_id, deleted_date)
+            VALUES ('{table}', old.id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+        END
+        ''')
+
+# Applied in order, each in its own transaction. Never edit or reorder an
+# entry once released; append a new one instead. Every step tolerates
+# objects that already exist, so databases created before versioning adopt
+# the history without changes.
+MIGRATIONS = (
+    (1, 'base tables', create_base_tables),
+    (2, 'listing indexes', create_listing_indexes),
+    (3, 'content versions', create_version_triggers),
+    (4, 'upload queue and media blobs', create_upload_tables),
+    (5, 'resumable uploads', create_resumable_tables),
+    (6, 'asset deletion outbox', create_outbox_tables),
+    (7, 'full-text search', create_search_index),
+    (8, 'admin password', seed_admin_password),
+    (9, 'opportunity author', add_opportunity_author),
+    (10, 'activity galleries', create_gallery_table),
+    (11, 'post archiving', add_archived_flag),
+    (12, 'modification dates', add_modified_dates),
+    (13, 'listing filter indexes', create_filter_indexes),
+    (14, 'deletion log', create_deletion_log),
+    (15, 'job schedule', create_schedule_table),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def create_version_table(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def current_version(conn=None):
+    """Highest applied migration, or 0 for an empty or unversioned database"""
+    cur = (conn or get_db()).cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+    if cur.fetchone() is None:
+        return 0
+    cur.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+    return cur.fetchone()[0]
+
+
+def migrate(target=LATEST_VERSION):
+    """Apply pending migrations up to `target`; returns the names applied"""
+    conn = get_db()
+    cur = conn.cursor()
+    create_version_table(cur)
+    conn.commit()
+
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version > target:
+            break
+        # Take the write lock before re-checking, so two deploys running
+        # migrate at once apply each step exactly once
+        cur.execute('BEGIN IMMEDIATE')
+        try:
+            cur.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,))
+            if cur.fetchone() is None:
+                step(cur)
+                cur.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                applied.append(name)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
+
+
+def check_schema():
+    """Compare the database's schema version with the code's.
+
+    Only the version number is read; with AUTO_MIGRATE on, pending
+    migrations are applied. Returns True when the schema is current.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return True
+    version = current_version()
+    if version < LATEST_VERSION:
+        if not current_app.config['AUTO_MIGRATE']:
+            current_app.logger.error('Database schema is at version %s but the code needs %s; run "flask migrate"',
+                                     version, LATEST_VERSION)
+            return False
+        migrate()
+    _schema_ready = True
+    return True
+
+
+def _require_current_schema():
+    if not check_schema():
+        return 'The database is being upgraded, please try again shortly.', 503
+
+
+def init_app(app):
+    """Register the migrate command and refuse requests until the schema is current"""
+    app.config.setdefault('AUTO_MIGRATE', DEFAULT_AUTO_MIGRATE)
+    app.config.setdefault('ADMIN_PASSWORD', DEFAULT_ADMIN_PASSWORD)
+    app.before_request(_require_current_schema)
+
+    @app.cli.command('migrate')
+    def migrate_command():
+        """Bring the database schema up to date"""
+        before = current_version()
+        for name in migrate():
+            print(f'Applied: {name}')
+        print(f'Schema at version {current_version()} (was {before})')
@@ -0,0 +1,191 @@
+import threading
+import time
+from db import get_db
+from media import get_store, RESOURCE_TYPES
+from metrics import timed_remote
+
+BATCH_SIZE = 100  # deletions sent to the media store at once
+MAX_BACKOFF = 3600
+DEFAULT_POLL_INTERVAL = 30.0
+DEFAULT_RECONCILE_INTERVAL = 24 * 3600.0
+REMOTE_FOLDER = 'tamsa/'
+ORPHAN_GRACE = 24 * 3600
+
+
+def create_outbox_tables(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS asset_deletions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    public_id TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- 'pending' or 'done'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_asset_deletions_due ON asset_deletions(status, next_attempt_date)')
+
+
+def create_schedule_table(cur):
+    """When each periodic job is next due, shared by every process"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS job_schedule (
+    name TEXT PRIMARY KEY,
+    next_run_date TIMESTAMP NOT NULL
+    )
+    ''')
+
+
+def claim_run(name, interval):
+    """Take the next run of a periodic job if it is due.
+
+    The update only succeeds for the first process to find the job due,
+    which also pushes it `interval` seconds ahead, so one run happens per
+    interval across all workers. Returns True for that process.
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute('''
+        INSERT INTO job_schedule (name, next_run_date) VALUES (?, datetime('now', '+' || ? || ' seconds'))
+        ON CONFLICT (name) DO UPDATE SET next_run_date = excluded.next_run_date
+        WHERE job_schedule.next_run_date <= CURRENT_TIMESTAMP
+    ''', (name, int(interval)))
+    claimed = cur.rowcount == 1
+    conn.commit()
+    return claimed
+
+
+def queue_deletion(cur, public_id, resource_type):
+    """Record a remote asset to destroy, inside the caller's transaction"""
+    cur.execute('INSERT INTO asset_deletions (public_id, resource_type) VALUES (?, ?)',
+                (public_id, resource_type))
+
+
+def queue_deletions(cur, assets):
+    """Record several (public_id, resource_type) assets to destroy at once"""
+    cur.executemany('INSERT INTO asset_deletions (public_id, resource_type) VALUES (?, ?)', assets)
+
+
+class DeletionOutbox:
+    """Drains asset_deletions in batches on a background thread.
+
+    Destroying a missing asset counts as success, so two processes draining
+    the same entry is harmless. The periodic reconcile is claimed through
+    job_schedule, so only one worker lists the remote store per interval.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._wake = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('OUTBOX_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        app.config.setdefault('RECONCILE_INTERVAL', DEFAULT_RECONCILE_INTERVAL)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='asset-outbox', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the worker after committing new deletions"""
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            self._wake.wait(self.app.config['OUTBOX_POLL_INTERVAL'])
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    while self.drain() == BATCH_SIZE:
+                        pass
+                    if claim_run('reconcile', self.app.config['RECONCILE_INTERVAL']):
+                        reconcile()
+                except Exception as e:
+                    self.app.logger.warning('Asset outbox run failed: %s', e)
+
+    def drain(self):
+        """Destroy one batch of due assets; returns how many were attempted"""
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('''
+            SELECT id, public_id, resource_type, attempts FROM asset_deletions
+            WHERE status = 'pending' AND next_attempt_date <= CURRENT_TIMESTAMP
+            ORDER BY next_attempt_date LIMIT ?
+        ''', (BATCH_SIZE,))
+        due = cur.fetchall()
+
+        by_type = {}
+        for entry in due:
+            by_type.setdefault(entry[2], []).append(entry)
+
+        for resource_type, entries in by_type.items():
+            try:
+                with timed_remote('delete_resources'):
+                    outcome = get_store().destroy_batch([e[1] for e in entries], resource_type)
+                failed = [e for e in entries if outcome.get(e[1]) not in ('deleted', 'not_found')]
+                error = 'Not deleted'
+            except Exception as e:
+                failed = entries
+                error = str(e)
+
+            done = [e for e in entries if e not in failed]
+            cur.executemany("UPDATE asset_deletions SET status = 'done' WHERE id = ?",
+                            [(e[0],) for e in done])
+            cur.executemany('''
+                UPDATE asset_deletions
+                SET attempts = attempts + 1, last_error = ?,
+                    next_attempt_date = datetime('now', '+' || ? || ' seconds')
+                WHERE id = ?
+            ''', [(error, min(2 ** (e[3] + 1) * 30, MAX_BACKOFF), e[0]) for e in failed])
+            conn.commit()
+
+        cur.execute("DELETE FROM asset_deletions WHERE status = 'done'")
+        conn.commit()
+        return len(due)
+
+
+outbox = DeletionOutbox()
+
+
+def _known_public_ids(cur):
+    cur.execute('''
+        SELECT cloudinary_public_id FROM documents
+        UNION SELECT picture_public_id FROM leaders
+        UNION SELECT media_public_id FROM activities
+        UNION SELECT media_public_id FROM opportunities
+        UNION SELECT media_public_id FROM activity_media
+        UNION SELECT public_id FROM media_blobs
+        UNION SELECT public_id FROM asset_deletions WHERE status = 'pending'
+    ''')
+    return {row[0] for row in cur.fetchall() if row[0]}
+
+
+def reconcile():
+    """Queue deletion of remote assets under tamsa/ that no row refers to.
+
+    Assets younger than ORPHAN_GRACE are left alone, since their row may
+    not have been written yet. Returns the number of orphans queued.
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    known = _known_public_ids(cur)
+    cutoff = time.time() - ORPHAN_GRACE
+    orphans = []
+
+    for resource_type in RESOURCE_TYPES:
+        with timed_remote('list_resources'):
+            for resource in get_store().list(REMOTE_FOLDER, resource_type):
+                if resource.public_id not in known and resource.created < cutoff:
+                    orphans.append((resource.public_id, resource_type))
+
+    for public_id, resource_type in orphans:
+        queue_deletion(cur, public_id, resource_type)
+    conn.commit()
+    if orphans:
+        outbox.notify()
+    return len(orphans)
@@ -0,0 +1,182 @@
+import base64
+import json
+from flask import request
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _order_tag(order):
+    """Name a listing order, e.g. 'created_date-,id-'"""
+    return ','.join(col + ('+' if direction == 'ASC' else '-') for col, direction in order)
+
+
+def encode_cursor(order, values):
+    """Turn the sort key of the last row on a page into an opaque token.
+
+    The token names its order, so it can't resume a listing sorted
+    differently even when the keys have the same shape.
+    """
+    raw = json.dumps([_order_tag(order)] + list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+# What a sort key can hold; anything else could not have come from encode_cursor
+CURSOR_TYPES = (str, int, float, type(None))
+
+
+def decode_cursor(token, order):
+    """Reverse encode_cursor, rejecting anything that doesn't round-trip
+    or was minted for another order"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or len(values) != len(order) + 1 or values[0] != _order_tag(order):
+        raise InvalidCursor(token)
+    values = values[1:]
+    if any(isinstance(value, bool) or not isinstance(value, CURSOR_TYPES) for value in values):
+        raise InvalidCursor(token)
+    return values
+
+
+def page_args(order, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE, strict=False):
+    """Read ?cursor= and ?per_page= from the query string, capping the size.
+
+    A cursor that doesn't fit `order` starts again from the first page, or
+    with `strict` raises InvalidCursor.
+    """
+    try:
+        per_page = int(request.args.get('per_page', default))
+    except ValueError:
+        per_page = default
+    per_page = max(1, min(per_page, maximum))
+
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor, order) if cursor else None
+    except InvalidCursor:
+        if strict:
+            raise
+        after = None
+    return per_page, after
+
+
+def _seek_clause(order):
+    """Build a WHERE clause that resumes strictly after a sort key.
+
+    `order` is a sequence of (column, 'ASC' | 'DESC'). When every column
+    sorts the same way a row-value comparison lets SQLite seek straight into
+    the index; mixed directions fall back to the equivalent OR chain.
+    """
+    directions = {direction for _, direction in order}
+    if len(directions) == 1:
+        op = '>' if directions.pop() == 'ASC' else '<'
+        columns = ', '.join(col for col, _ in order)
+        placeholders = ', '.join('?' for _ in order)
+        return f'({columns}) {op} ({placeholders})'
+
+    parts = []
+    for i, (column, direction) in enumerate(order):
+        op = '>' if direction == 'ASC' else '<'
+        equal = [f'{col} = ?' for col, _ in order[:i]]
+        parts.append('(' + ' AND '.join(equal + [f'{column} {op} ?']) + ')')
+    return '(' + ' OR '.join(parts) + ')'
+
+
+def _seek_params(order, values):
+    if len({direction for _, direction in order}) == 1:
+        return list(values)
+    params = []
+    for i in range(len(values)):
+        params.extend(values[:i + 1])
+    return params
+
+
+def keyset_page(conn, table, order, per_page, after=None, columns='*', where=None, params=(), row_type=None):
+    """Fetch one page of `table` ordered by `order`, starting after `after`.
+
+    Returns (rows, next_cursor). next_cursor is None on the last page. With
+    a record `row_type` its column list is selected and rows come back as
+    records.
+    """
+    if row_type is not None:
+        columns = row_type.select_list
+    clauses = [where] if where else []
+    params = list(params)
+    if after is not None:
+        if len(after) != len(order):
+            after = None
+        else:
+            clauses.append(_seek_clause(order))
+            params.extend(_seek_params(order, after))
+
+    sql = f'SELECT {columns} FROM {table}'
+    if clauses:
+        sql += ' WHERE ' + ' AND '.join(clauses)
+    sql += ' ORDER BY ' + ', '.join(f'{col} {direction}' for col, direction in order)
+    sql += ' LIMIT ?'
+    params.append(per_page + 1)
+
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        names = [d[0] for d in cur.description]
+        last = rows[-1]
+        next_cursor = encode_cursor(order, (last[names.index(col)] for col, _ in order))
+    if row_type is not None:
+        rows = row_type.from_rows(rows)
+    return rows, next_cursor
+
+
+def keyset_union_page(conn, sources, order, per_page, after=None, columns='*', source_params=(), row_type=None):
+    """Page through several SELECTs merged into one ordered timeline.
+
+    Each source is seeked and limited on its own, so SQLite reads at most one
+    page from each index and only merges those rows, instead of sorting the
+    union of every table. `source_params` are bound to every source, and
+    `row_type` works as in keyset_page.
+    """
+    if row_type is not None:
+        columns = row_type.select_list
+    order_by = ' ORDER BY ' + ', '.join(f'{col} {direction}' for col, direction in order)
+    seek = None
+    if after is not None and len(after) == len(order):
+        seek = _seek_clause(order)
+
+    arms = []
+    params = []
+    for source in sources:
+        arm = f'SELECT {columns} FROM ({source})'
+        params.extend(source_params)
+        if seek:
+            arm += ' WHERE ' + seek
+            params.extend(_seek_params(order, after))
+        arms.append(f'SELECT * FROM ({arm}{order_by} LIMIT ?)')
+        params.append(per_page + 1)
+
+    sql = ' UNION ALL '.join(arms) + order_by + ' LIMIT ?'
+    params.append(per_page + 1)
+
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        names = [d[0] for d in cur.description]
+        last = rows[-1]
+        next_cursor = encode_cursor(order, (last[names.index(col)] for col, _ in order))
+    if row_type is not None:
+        rows = row_type.from_rows(rows)
+    return rows, next_cursor
@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+
+def record(name, columns):
+    """Build a lightweight row type for an explicit SELECT list.
+
+    `columns` holds column names or 'expression AS alias' entries; the
+    record's attributes are the names/aliases, in order. Records are
+    namedtuples, so they carry no per-row __dict__ and are built straight
+    from the tuples sqlite3 returns.
+    """
+    fields = [column.rsplit(' AS ', 1)[-1].strip() for column in columns]
+    base = namedtuple(name, fields)
+    return type(name, (base,), {
+        '__slots__': (),
+        'select_list': ', '.join(columns),
+        'from_rows': classmethod(lambda cls, rows: list(map(cls._make, rows))),
+    })
+
+
+def fetch_all(cur, record_type):
+    """Map every remaining row of a cursor to record_type"""
+    return record_type.from_rows(cur.fetchall())
+
+
+def fetch_one(cur, record_type):
+    row = cur.fetchone()
+    return record_type._make(row) if row is not None else None
+
+
+Document = record('Document', (
+    'id', 'title', 'category', 'filename', 'cloudinary_url AS url', 'cloudinary_public_id AS public_id',
+    'uploader', 'upload_date', 'media_status',
+))
+
+Opportunity = record('Opportunity', (
+    'id', 'title', 'description', 'type', 'deadline', 'event_date', 'location', 'media_url',
+    'media_public_id', 'media_type', 'created_date', 'media_status', 'author',
+))
+
+Activity = record('Activity', (
+    'id', 'title', 'description', 'date', 'location', 'media_url', 'media_public_id', 'media_type',
+    'author', 'created_date', 'media_status',
+))
+
+# One extra photo or video of an activity
+GalleryItem = record('GalleryItem', (
+    'id', 'activity_id', 'position', 'filename', 'media_url', 'media_public_id', 'media_type', 'media_status',
+))
+
+Leader = record('Leader', (
+    'id', 'name', 'position', 'picture_url', 'picture_public_id', 'bio', 'order_index',
+    'created_date', 'media_status',
+))
+
+# One entry of the merged admin feed on /actions
+FeedPost = record('FeedPost', ('id', 'title', 'type', 'date', 'category', 'archived'))
+
+# A raw full-text match before highlighting
+SearchHit = record('SearchHit', ('kind', 'id', 'title', 'snippet', 'url', 'rank'))
@@ -0,0 +1,179 @@
+import os
+import shutil
+import uuid
+from flask import Blueprint, request, session, jsonify
+from werkzeug.utils import secure_filename
+from db import get_db
+from uploads import upload_queue, Spooled
+
+resumable_bp = Blueprint('resumable_bp', __name__)
+
+CHUNK_SIZE = 5 * 1024 * 1024
+READ_BUFFER = 64 * 1024
+MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024
+STALE_AFTER = '-1 day'
+
+ALLOWED_TYPES = ['image/jpeg', 'image/png', 'image/gif', 'image/webp',
+                 'video/mp4', 'video/mov', 'video/avi', 'video/webm', 'video/quicktime']
+
+
+def create_resumable_tables(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS resumable_uploads (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    total_size INTEGER NOT NULL,
+    received INTEGER NOT NULL DEFAULT 0,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'receiving', -- 'receiving', 'complete' or 'claimed'
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+
+def claim_upload(cur, upload_id):
+    """Hand a finished upload to a form handler exactly once.
+
+    Runs in the caller's transaction, which must also add the upload job:
+    committing both together keeps purge_stale_uploads from ever seeing a
+    claimed file without its job. Returns (Spooled, content_type), or None
+    if the id is unknown, incomplete or already used.
+    """
+    cur.execute('''
+        UPDATE resumable_uploads SET status = 'claimed', updated_date = CURRENT_TIMESTAMP
+        WHERE id = ? AND status = 'complete'
+    ''', (upload_id,))
+    if cur.rowcount != 1:
+        return None
+    cur.execute('SELECT path, content_type FROM resumable_uploads WHERE id = ?', (upload_id,))
+    path, content_type = cur.fetchone()
+    # Left unhashed: the upload worker hashes it, off the request thread
+    return Spooled(path, None), content_type
+
+
+def purge_stale_uploads():
+    """Remove parts of uploads that were abandoned part-way through, and
+    claimed files no upload job is still going to read"""
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT id, path FROM resumable_uploads
+        WHERE status != 'claimed' AND updated_date < datetime('now', '{STALE_AFTER}')
+    ''')
+    for upload_id, path in cur.fetchall():
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        cur.execute('DELETE FROM resumable_uploads WHERE id = ?', (upload_id,))
+    cur.execute('''
+        SELECT id, path FROM resumable_uploads r
+        WHERE status = 'claimed' AND NOT EXISTS (
+            SELECT 1 FROM media_uploads u
+            WHERE u.spool_path = r.path AND u.status IN ('pending', 'uploading'))
+    ''')
+    for upload_id, path in cur.fetchall():
+        # Finished jobs have already removed their file
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        cur.execute('DELETE FROM resumable_uploads WHERE id = ?', (upload_id,))
+    conn.commit()
+
+
+def _state(upload_id):
+    cur = get_db().cursor()
+    cur.execute('SELECT total_size, received, path, status FROM resumable_uploads WHERE id = ?', (upload_id,))
+    return cur.fetchone()
+
+
+@resumable_bp.route('/uploads/resumable', methods=['POST'])
+def start_upload():
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '') or 'upload'
+    content_type = data.get('content_type')
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'File size is required'}), 400
+
+    if content_type not in ALLOWED_TYPES:
+        return jsonify({'success': False, 'message': 'Please upload only image or video files'}), 400
+    if size <= 0 or size > MAX_UPLOAD_SIZE:
+        return jsonify({'success': False, 'message': 'File is empty or too large'}), 400
+
+    upload_id = uuid.uuid4().hex
+    directory = os.path.join(upload_queue.spool_dir, upload_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    # Reserve the file so parts can be written at their offsets
+    open(path, 'wb').close()
+
+    conn = get_db()
+    conn.execute('''
+        INSERT INTO resumable_uploads (id, filename, content_type, total_size, path)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (upload_id, filename, content_type, size, path))
+    conn.commit()
+
+    return jsonify({'success': True, 'upload_id': upload_id, 'chunk_size': CHUNK_SIZE, 'received': 0})
+
+
+@resumable_bp.route('/uploads/resumable/<string:upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    state = _state(upload_id)
+    if not state:
+        return jsonify({'success': False, 'message': 'Unknown upload'}), 404
+    size, received, path, status = state
+    return jsonify({'success': True, 'size': size, 'received': received, 'complete': status != 'receiving'})
+
+
+@resumable_bp.route('/uploads/resumable/<string:upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+
+    state = _state(upload_id)
+    if not state:
+        return jsonify({'success': False, 'message': 'Unknown upload'}), 404
+    size, received, path, status = state
+
+    # Clients resume from the last acknowledged byte; anything else is stale
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Upload-Offset header is required'}), 400
+    if status != 'receiving' or offset != received:
+        return jsonify({'success': False, 'message': 'Offset mismatch', 'received': received}), 409
+
+    length = request.content_length
+    if length is None:
+        return jsonify({'success': False, 'message': 'Content-Length header is required', 'received': received}), 411
+    if length > CHUNK_SIZE or offset + length > size:
+        return jsonify({'success': False, 'message': 'Chunk too large', 'received': received}), 413
+
+    # Stream the part straight to disk in small reads so memory stays flat
+    written = 0
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        while written < length:
+            block = request.stream.read(min(READ_BUFFER, length - written))
+            if not block:
+                break
+            f.write(block)
+            written += len(block)
+
+    received = offset + written
+    conn = get_db()
+    conn.execute('''
+        UPDATE resumable_uploads
+        SET received = ?, status = CASE WHEN ? >= total_size THEN 'complete' ELSE 'receiving' END,
+            updated_date = CURRENT_TIMESTAMP
+        WHERE id = ? AND received = ?
+    ''', (received, received, upload_id, offset))
+    conn.commit()
+
+    return jsonify({'success': True, 'received': received, 'complete': received >= size})
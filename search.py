@@ -0,0 +1,136 @@
+import re
+from flask import Blueprint, request, render_template, url_for
+from markupsafe import Markup, escape
+from db import get_db
+from pagination import page_args, keyset_union_page
+from records import SearchHit
+from conditional import conditional, CONTENT_TABLES
+
+search_bp = Blueprint('search_bp', __name__)
+
+# Markers wrapped around matched terms by FTS5. They are swapped for <mark>
+# only after the text has been escaped.
+HIT_START = '\x02'
+HIT_END = '\x03'
+
+# Content table -> columns indexed in its FTS5 shadow table
+SEARCH_TABLES = {
+    'activities': ('title', 'description', 'location'),
+    'opportunities': ('title', 'description', 'location'),
+    'documents': ('title', 'category', 'filename'),
+    'leaders': ('name', 'position', 'bio'),
+}
+
+SEARCH_SOURCES = {
+    'Activity': f"""SELECT 'Activity' AS kind, f.rowid AS id, highlight(activities_fts, 0, '{HIT_START}', '{HIT_END}') AS title,
+        snippet(activities_fts, -1, '{HIT_START}', '{HIT_END}', '...', 24) AS snippet, NULL AS url, bm25(activities_fts, 10.0, 1.0, 2.0) AS rank
+        FROM activities_fts f JOIN activities a ON a.id = f.rowid WHERE activities_fts MATCH ? AND a.archived = 0""",
+    'Opportunity': f"""SELECT 'Opportunity' AS kind, f.rowid AS id, highlight(opportunities_fts, 0, '{HIT_START}', '{HIT_END}') AS title,
+        snippet(opportunities_fts, -1, '{HIT_START}', '{HIT_END}', '...', 24) AS snippet, NULL AS url, bm25(opportunities_fts, 10.0, 1.0, 2.0) AS rank
+        FROM opportunities_fts f JOIN opportunities o ON o.id = f.rowid WHERE opportunities_fts MATCH ? AND o.archived = 0""",
+    'Document': f"""SELECT 'Document' AS kind, f.rowid AS id, highlight(documents_fts, 0, '{HIT_START}', '{HIT_END}') AS title,
+        snippet(documents_fts, -1, '{HIT_START}', '{HIT_END}', '...', 24) AS snippet, d.cloudinary_url AS url, bm25(documents_fts, 10.0, 2.0, 1.0) AS rank
+        FROM documents_fts f JOIN documents d ON d.id = f.rowid WHERE documents_fts MATCH ? AND d.archived = 0""",
+    'Leadership': f"""SELECT 'Leadership' AS kind, f.rowid AS id, highlight(leaders_fts, 0, '{HIT_START}', '{HIT_END}') AS title,
+        snippet(leaders_fts, -1, '{HIT_START}', '{HIT_END}', '...', 24) AS snippet, NULL AS url, bm25(leaders_fts, 10.0, 5.0, 1.0) AS rank
+        FROM leaders_fts f JOIN leaders l ON l.id = f.rowid WHERE leaders_fts MATCH ? AND l.archived = 0""",
+}
+SEARCH_ORDER = (('rank', 'ASC'), ('kind', 'ASC'), ('id', 'ASC'))
+
+
+def create_search_index(cur):
+    """Create the FTS5 tables and the triggers that keep them in sync"""
+    for table, columns in SEARCH_TABLES.items():
+        fts = f'{table}_fts'
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        existed = cur.fetchone() is not None
+
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'new.{c}' for c in columns)
+        old_values = ', '.join(f'old.{c}' for c in columns)
+        cur.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {column_list}, content='{table}', content_rowid='id', tokenize='porter unicode61'
+            )
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+
+        # Index rows written before the search table existed
+        if not existed:
+            cur.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def rebuild_search_index():
+    """Re-index every content table from scratch and compact the indexes"""
+    conn = get_db()
+    for table in SEARCH_TABLES:
+        fts = f'{table}_fts'
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+    conn.commit()
+
+
+def match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match, the
+    last one as a prefix so results appear while typing"""
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _highlight(text):
+    if not text:
+        return ''
+    return Markup(str(escape(text)).replace(HIT_START, '<mark>').replace(HIT_END, '</mark>'))
+
+
+def _result_url(kind, item_id, url):
+    if kind == 'Opportunity':
+        return url_for('main_bp.opportunity_detail', opp_id=item_id)
+    if kind == 'Activity':
+        return url_for('main_bp.activities')
+    if kind == 'Leadership':
+        return url_for('main_bp.leadership')
+    return url
+
+
+@search_bp.route('/search')
+@conditional(*CONTENT_TABLES)
+def search():
+    query = request.args.get('q', '').strip()
+    match = match_query(query)
+
+    results = []
+    next_cursor = None
+    if match:
+        per_page, after = page_args(SEARCH_ORDER)
+        hits, next_cursor = keyset_union_page(get_db(), list(SEARCH_SOURCES.values()), SEARCH_ORDER,
+                                              per_page, after, source_params=(match,), row_type=SearchHit)
+        for hit in hits:
+            results.append({
+                'kind': hit.kind,
+                'id': hit.id,
+                'title': _highlight(hit.title),
+                'snippet': _highlight(hit.snippet),
+                'url': _result_url(hit.kind, hit.id, hit.url)
+            })
+
+    return render_template('search.html', query=query, results=results, next_cursor=next_cursor)
@@ -0,0 +1,89 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const deleteModal = new bootstrap.Modal(document.getElementById('deleteModal'));
+    let pendingDelete = null;
+
+    function postJson(url, body) {
+      return fetch(url, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: body ? JSON.stringify(body) : undefined
+      })
+      .then(response => response.json())
+      .then(data => {
+        if (data.success) {
+          // Reload the page to reflect changes
+          window.location.reload();
+        } else {
+          alert('Error: ' + data.message);
+        }
+      })
+      .catch(error => {
+        console.error('Error:', error);
+        alert('An error occurred while updating the posts.');
+      });
+    }
+
+    // Set up delete buttons
+    document.querySelectorAll('.delete-btn').forEach(button => {
+      button.addEventListener('click', function() {
+        const url = `/actions/delete/${this.dataset.category}/${this.dataset.postId}`;
+        pendingDelete = () => postJson(url);
+        document.getElementById('postTitle').textContent = `"${this.dataset.title}"`;
+        deleteModal.show();
+      });
+    });
+
+    // Handle confirmed deletion
+    document.getElementById('confirmDelete').addEventListener('click', function() {
+      if (pendingDelete) {
+        pendingDelete();
+        pendingDelete = null;
+      }
+
+      deleteModal.hide();
+    });
+
+    // Bulk actions over the selected posts
+    const checkboxes = Array.from(document.querySelectorAll('.post-select'));
+    const selectAll = document.getElementById('selectAll');
+    const bulkButtons = document.querySelectorAll('.bulk-btn');
+
+    function selectedPosts() {
+      return checkboxes.filter(box => box.checked)
+                       .map(box => [box.dataset.category, Number(box.dataset.postId)]);
+    }
+
+    function updateBulkBar() {
+      const count = selectedPosts().length;
+      document.getElementById('selectedCount').textContent = count;
+      bulkButtons.forEach(button => { button.disabled = count === 0; });
+      selectAll.checked = count > 0 && count === checkboxes.length;
+    }
+
+    if (selectAll) {
+      selectAll.addEventListener('change', function() {
+        checkboxes.forEach(box => { box.checked = selectAll.checked; });
+        updateBulkBar();
+      });
+      checkboxes.forEach(box => box.addEventListener('change', updateBulkBar));
+
+      bulkButtons.forEach(button => {
+        button.addEventListener('click', function() {
+          const operation = this.dataset.operation;
+          const body = {posts: selectedPosts()};
+          if (operation === 'recategorise') {
+            body.category = document.getElementById('bulkCategory').value;
+          }
+          if (operation === 'delete') {
+            pendingDelete = () => postJson('/actions/bulk/delete', body);
+            document.getElementById('postTitle').textContent = `${body.posts.length} selected posts`;
+            deleteModal.show();
+          } else {
+            postJson(`/actions/bulk/${operation}`, body);
+          }
+        });
+      });
+    }
+  });
@@ -0,0 +1,36 @@
+const hamburger = document.querySelector('.fa-bars');
+const navlinks = document.querySelector('.nav-links');
+
+hamburger.addEventListener('click', (e)=>{
+    e.stopPropagation();
+    navlinks.classList.toggle('show');
+});
+
+ document.addEventListener('click', (e) => {
+  if (navlinks.classList.contains('show') && 
+      e.target !== hamburger && 
+      !navlinks.contains(e.target)) {
+    navlinks.classList.remove('show');
+  }
+});
+
+navlinks.querySelectorAll('a').forEach(link => {
+  link.addEventListener('click', () => {
+    navlinks.classList.remove('show');
+  });
+});
+
+// Set minimum date to today for the date picker
+document.getElementById('date').max = new Date().toISOString().split('T')[0];
+
+// File upload validation
+document.getElementById('media_file').addEventListener('change', function(e) {
+    const file = e.target.files[0];
+    if (file) {
+        const maxSize = 50 * 1024 * 1024; // 50MB
+        if (file.size > maxSize) {
+            alert('File size must be less than 50MB');
+            e.target.value = '';
+        }
+    }
+});
@@ -0,0 +1,234 @@
+    const hamburger = document.querySelector('.fa-bars');
+    const navlinks = document.querySelector('.nav-links');
+
+    hamburger.addEventListener('click', (e)=>{
+        e.stopPropagation();
+        navlinks.classList.toggle('show');
+    });
+
+     document.addEventListener('click', (e) => {
+      if (navlinks.classList.contains('show') && 
+          e.target !== hamburger && 
+          !navlinks.contains(e.target)) {
+        navlinks.classList.remove('show');
+      }
+    });
+
+    navlinks.querySelectorAll('a').forEach(link => {
+      link.addEventListener('click', () => {
+        navlinks.classList.remove('show');
+      });
+    });
+
+        // Page Navigation
+     document.addEventListener('DOMContentLoaded', function() {
+    // Navigation links
+    const navLinks = document.querySelectorAll('.nav-link');
+    const pages = document.querySelectorAll('.page');
+
+    navLinks.forEach(link => {
+        link.addEventListener('click', function(e) {
+            e.preventDefault();
+            const targetPage = this.getAttribute('data-page');
+
+            // Hide all pages
+            pages.forEach(page => {
+                page.classList.remove('active');
+            });
+
+            // Show target page
+            document.getElementById(`${targetPage}-page`).classList.add('active');
+           });
+         });
+      });        
+
+
+     function toggleTypeSpecific() {
+    const type = document.getElementById('opp_type').value;
+    const opportunityFields = document.getElementById('opportunity-fields');
+    const announcementFields = document.getElementById('announcement-fields');
+
+    if (type === 'opportunity') {
+        opportunityFields.style.display = 'block';
+        announcementFields.style.display = 'none';
+    } else if (type === 'announcement') {
+        opportunityFields.style.display = 'none';
+        announcementFields.style.display = 'block';
+    } else {
+        opportunityFields.style.display = 'none';
+        announcementFields.style.display = 'none';
+    }
+}    
+
+        // Set minimum date to today for date inputs
+    document.addEventListener('DOMContentLoaded', function() {
+    const today = new Date().toISOString().split('T')[0];
+    document.getElementById('activity_date').min = today;
+
+    // File upload validation
+    const fileInputs = document.querySelectorAll('input[type="file"]');
+    fileInputs.forEach(input => {
+        input.addEventListener('change', function(e) {
+            const files = Array.from(e.target.files);
+            // A single video on a resumable input is sent in chunks, so no size cap
+            const chunked = input.dataset.resumable && files.length === 1 && files[0].type.startsWith('video/');
+            const maxSize = 50 * 1024 * 1024; // 50MB
+            if (!chunked && files.some(file => file.size > maxSize)) {
+                alert('Each file must be less than 50MB');
+                e.target.value = '';
+                 }
+               });
+             });
+         });
+
+        // Auto-dismiss flash messages after 3 seconds
+        document.addEventListener('DOMContentLoaded', function() {
+        const flashMessages = document.querySelectorAll('.flash-message');
+
+        flashMessages.forEach(function(message) {
+         setTimeout(function() {
+            message.style.transition = 'opacity 0.5s ease';
+            message.style.opacity = '0';
+
+            // Remove from DOM after fade out
+            setTimeout(function() {
+                if (message.parentNode) {
+                    message.parentNode.removeChild(message);
+                }
+            }, 500);
+
+         }, 3000);
+       });
+    });
+
+    // Send videos in resumable chunks before submitting the form
+    async function uploadInChunks(file, progress) {
+        let response = await fetch('/uploads/resumable', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({filename: file.name, content_type: file.type, size: file.size})
+        });
+        const upload = await response.json();
+        if (!upload.success) {
+            throw new Error(upload.message);
+        }
+
+        let offset = 0;
+        let failures = 0;
+        while (offset < file.size) {
+            try {
+                response = await fetch(`/uploads/resumable/${upload.upload_id}`, {
+                    method: 'PUT',
+                    headers: {'Upload-Offset': offset},
+                    body: file.slice(offset, offset + upload.chunk_size)
+                });
+                const state = await response.json();
+                if (!response.ok && response.status !== 409) {
+                    throw new Error(state.message);
+                }
+                offset = state.received;
+                failures = 0;
+            } catch (error) {
+                // Wait, then ask the server where to resume from
+                if (++failures > 10) {
+                    throw error;
+                }
+                await new Promise(resolve => setTimeout(resolve, 2000 * failures));
+                try {
+                    const state = await (await fetch(`/uploads/resumable/${upload.upload_id}`)).json();
+                    offset = state.received;
+                } catch (ignored) {}
+            }
+            progress.textContent = `Uploading... ${Math.floor(offset * 100 / file.size)}%`;
+        }
+        return upload.upload_id;
+    }
+
+    document.querySelectorAll('input[data-resumable]').forEach(input => {
+        const form = input.form;
+        form.addEventListener('submit', async function(e) {
+            const file = input.files[0];
+            if (input.files.length !== 1 || !file.type.startsWith('video/') || form.dataset.uploaded) {
+                return;
+            }
+            e.preventDefault();
+            const progress = input.parentNode.querySelector('.upload-progress');
+            try {
+                form.elements[input.dataset.resumable].value = await uploadInChunks(file, progress);
+                input.value = '';
+                form.dataset.uploaded = 'true';
+                form.submit();
+            } catch (error) {
+                progress.textContent = '';
+                alert('Upload failed: ' + error.message);
+            }
+        });
+    });
+
+    // Follow each file of a batch until the upload queue has stored it
+    function trackFiles(statusUrl, list, progress) {
+        const timer = setInterval(async () => {
+            let state;
+            try {
+                state = await (await fetch(statusUrl, {headers: {'Accept': 'application/json'}})).json();
+            } catch (ignored) {
+                return;
+            }
+            list.innerHTML = '';
+            state.files.forEach(file => {
+                const item = document.createElement('li');
+                const name = file.position === 0 ? 'Cover' : file.filename;
+                const label = {pending: 'uploading...', ready: 'done', failed: 'failed'}[file.status] || file.status;
+                item.textContent = `${name}: ${label}` + (file.status === 'pending' && file.attempts > 1 ? ` (attempt ${file.attempts})` : '');
+                item.className = file.status;
+                list.appendChild(item);
+            });
+            progress.textContent = state.pending ? `Processing ${state.files.length - state.pending} of ${state.files.length} files` : 'All files processed';
+            if (!state.pending) {
+                clearInterval(timer);
+            }
+        }, 2000);
+    }
+
+    // Several files go in one request; the response says where to follow them
+    document.querySelectorAll('input[data-batch]').forEach(input => {
+        const form = input.form;
+        form.addEventListener('submit', function(e) {
+            if (input.files.length < 2) {
+                return;
+            }
+            e.preventDefault();
+            const progress = input.parentNode.querySelector('.upload-progress');
+            const list = input.parentNode.querySelector('.upload-files');
+            const xhr = new XMLHttpRequest();
+            xhr.open('POST', form.action || window.location.href);
+            xhr.setRequestHeader('Accept', 'application/json');
+            xhr.upload.addEventListener('progress', event => {
+                if (event.lengthComputable) {
+                    progress.textContent = `Sending... ${Math.floor(event.loaded * 100 / event.total)}%`;
+                }
+            });
+            xhr.addEventListener('load', () => {
+                let result = null;
+                try {
+                    result = JSON.parse(xhr.responseText);
+                } catch (ignored) {}
+                if (!result || !result.success) {
+                    // The form was rejected: show the page with its message
+                    document.open();
+                    document.write(xhr.responseText);
+                    document.close();
+                    return;
+                }
+                form.reset();
+                trackFiles(result.status_url, list, progress);
+            });
+            xhr.addEventListener('error', () => {
+                progress.textContent = '';
+                alert('Upload failed, please try again');
+            });
+            xhr.send(new FormData(form));
+        });
+    });
+
+    toggleTypeSpecific();
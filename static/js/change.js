@@ -0,0 +1,26 @@
+const new = document.querySelector('#new');
+const confirm = document.querySelector('#confirm');
+
+document.addEventListener('DOMContentLoaded', function() {
+  const newPassword = document.getElementById('new_password');
+  const confirmPassword = document.getElementById('confirm_password');
+  const form = document.querySelector('form');
+
+  function validatePasswords() {
+    if (newPassword.value !== confirmPassword.value) {
+      confirmPassword.setCustomValidity('Passwords do not match');
+    } else {
+      confirmPassword.setCustomValidity('');
+    }
+  }
+
+  newPassword.addEventListener('input', validatePasswords);
+  confirmPassword.addEventListener('input', validatePasswords);
+
+  form.addEventListener('submit', function(e) {
+    validatePasswords();
+    if (!form.checkValidity()) {
+      e.preventDefault();
+    }
+  });
+});
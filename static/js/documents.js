@@ -0,0 +1,73 @@
+    //DOM Contents
+    const docTitle = document.querySelector('#document-title');
+    const docCategory = document.querySelector('#document-category');
+    const doc = document.querySelector('#document-file');
+    const uploadBtn = document.querySelector('.btn');
+    const sarchie = document.querySelector('.search');
+    const toggleBtn = document.querySelector('#magni');
+    const removeBtn = document.querySelector('.fa-xmark');
+    const searchArea = document.querySelector('.searcharea');
+    const searchBtn = document.querySelector('.search .fa-magnifying-glass');
+    const hamburger = document.querySelector('.fa-bars');
+    const navlinks = document.querySelector('.nav-links');
+    const categoryFilter = document.querySelector('.category-filter');
+    const filterForm = document.querySelector('.document-filters');
+
+  hamburger.addEventListener('click', (e)=>{
+        e.stopPropagation();
+        navlinks.classList.toggle('show');
+    });
+
+  document.addEventListener('click', (e) => {
+      if (navlinks.classList.contains('show') && 
+          e.target !== hamburger && 
+          !navlinks.contains(e.target)) {
+        navlinks.classList.remove('show');
+      }
+    });
+
+  navlinks.querySelectorAll('a').forEach(link => {
+      link.addEventListener('click', () => {
+      navlinks.classList.remove('show');
+      });
+    });
+
+  function toggleSearchBar() {
+    const isSearchVisible = sarchie.style.display === 'block';
+
+    sarchie.style.display = isSearchVisible ? 'none' : 'block';
+    removeBtn.style.display = isSearchVisible ? 'none' : 'inline-block';
+    toggleBtn.style.display = isSearchVisible ? 'inline-block' : 'none';
+
+    // Focus on search input when shown
+    if (!isSearchVisible) {
+        setTimeout(() => searchArea.focus(), 100);
+    }
+}
+
+toggleBtn.addEventListener('click', toggleSearchBar);
+removeBtn.addEventListener('click', function() {
+    // Closing an active search shows every document again
+    if (searchArea.defaultValue) {
+        searchArea.value = '';
+        filterForm.submit();
+        return;
+    }
+    toggleSearchBar();
+});
+
+// An active search keeps the bar open
+if (sarchie.style.display === 'block') {
+    removeBtn.style.display = 'inline-block';
+    toggleBtn.style.display = 'none';
+}
+
+// Category and search are applied by the server across every page of
+// documents, not just the cards on this one
+categoryFilter.addEventListener('change', function() {
+    filterForm.submit();
+});
+
+searchBtn.addEventListener('click', function() {
+    filterForm.submit();
+});
@@ -0,0 +1,166 @@
+    const hamburger = document.querySelector('.fa-bars');
+    const navlinks = document.querySelector('.nav-links');
+
+    let sectionImages = {};
+    const sectionIntervals = {};
+    const currentIndices = {
+          leadership: 0,
+          documents: 0,
+          activities: 0,
+          announcements: 0
+          };
+
+    hamburger.addEventListener('click', (e)=>{
+        e.stopPropagation();
+        navlinks.classList.toggle('show');
+    });
+
+     document.addEventListener('click', (e) => {
+      if (navlinks.classList.contains('show') && 
+          e.target !== hamburger && 
+          !navlinks.contains(e.target)) {
+        navlinks.classList.remove('show');
+      }
+    });
+
+    navlinks.querySelectorAll('a').forEach(link => {
+      link.addEventListener('click', () => {
+        navlinks.classList.remove('show');
+      });
+    });
+
+
+
+    // Initialize when DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+  // Initialize section images after DOM is ready
+  sectionImages = {
+    leadership: document.querySelector('section:nth-of-type(4) img'),
+    documents: document.querySelector('section:nth-of-type(1) img'),
+    activities: document.querySelector('section:nth-of-type(3) img'),
+    announcements: document.querySelector('section:nth-of-type(2) img')
+  };
+
+  console.log('Found images:', sectionImages);
+  initImageRotation();
+});
+
+function initImageRotation() {
+  // Wrap images in containers and add initial styling
+  Object.values(sectionImages).forEach(img => {
+    if (img && img.parentElement && !img.parentElement.classList.contains('image-container')) {
+      const container = document.createElement('div');
+      container.className = 'image-container';
+      img.parentNode.insertBefore(container, img);
+      container.appendChild(img);
+      img.classList.add('rotating-image');
+    }
+  });
+
+  // Setup Intersection Observer for each section
+  setupIntersectionObservers();
+}
+
+// Helper function to determine section type
+function getSectionType(section) {
+  const h1Text = section.querySelector('h1')?.textContent.toLowerCase() || '';
+
+  if (h1Text.includes('document')) return 'documents';
+  if (h1Text.includes('annoucement')) return 'announcements';
+  if (h1Text.includes('social') || h1Text.includes('activit')) return 'activities';
+  if (h1Text.includes('leadership')) return 'leadership';
+
+  return 'unknown';
+}
+
+function setupIntersectionObservers() {
+  const sections = document.querySelectorAll('main section');
+
+  const observerOptions = {
+    root: null,
+    threshold: 0.5, // Reduced from 0.75 to make it more sensitive
+    rootMargin: '0px'
+  };
+
+  const observer = new IntersectionObserver((entries) => {
+    entries.forEach(entry => {
+      const section = entry.target;
+      const sectionType = getSectionType(section);
+
+      if (entry.isIntersecting) {
+        console.log(`Starting rotation for ${sectionType}`);
+        startSectionRotation(sectionType);
+      } else {
+        console.log(`Stopping rotation for ${sectionType}`);
+        stopSectionRotation(sectionType);
+      }
+    });
+  }, observerOptions);
+
+  sections.forEach(section => {
+    observer.observe(section);
+  });
+}
+
+function startSectionRotation(sectionType) {
+  stopSectionRotation(sectionType);
+
+  sectionIntervals[sectionType] = setInterval(() => {
+    rotateSingleImage(sectionType);
+  }, 4000);
+}
+
+    function stopSectionRotation(sectionType) {
+  if (sectionIntervals[sectionType]) {
+    clearInterval(sectionIntervals[sectionType]);
+    sectionIntervals[sectionType] = null;
+  }
+}
+
+function rotateSingleImage(sectionType) {
+  const img = sectionImages[sectionType];
+  const images = imageCollections[sectionType];
+  const animationTypes = ['slide-left'];
+
+  if (img && images && images.length > 1) {
+    const animationType = animationTypes[Math.floor(Math.random() * animationTypes.length)];
+
+    //img.classList.add('fade-out');
+
+    setTimeout(() => {
+      currentIndices[sectionType] = (currentIndices[sectionType] + 1) % images.length;
+      const next = images[currentIndices[sectionType]];
+      img.srcset = next.srcset;
+      img.src = next.src;
+
+      //img.classList.remove('fade-out');
+      img.classList.add(animationType);
+
+      setTimeout(() => {
+        img.classList.remove(animationType);
+      }, 800);
+    }, 400);
+  }
+}
+
+// Handle page visibility changes
+document.addEventListener('visibilitychange', function() {
+  if (document.hidden) {
+    Object.keys(sectionIntervals).forEach(sectionType => {
+      stopSectionRotation(sectionType);
+    });
+  } else {
+    const sections = document.querySelectorAll('main section');
+    sections.forEach(section => {
+      const rect = section.getBoundingClientRect();
+      const visibleHeight = Math.min(rect.bottom, window.innerHeight) - Math.max(rect.top, 0);
+      const sectionHeight = rect.height;
+      const visibilityRatio = visibleHeight / sectionHeight;
+
+      if (visibilityRatio >= 0.5) {
+        const sectionType = getSectionType(section);
+        startSectionRotation(sectionType);
+      }
+    });
+  }
+});
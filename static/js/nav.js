@@ -0,0 +1,21 @@
+const hamburger = document.querySelector('.fa-bars');
+const navlinks = document.querySelector('.nav-links');
+
+hamburger.addEventListener('click', (e)=>{
+    e.stopPropagation();
+    navlinks.classList.toggle('show');
+});
+
+ document.addEventListener('click', (e) => {
+  if (navlinks.classList.contains('show') && 
+      e.target !== hamburger && 
+      !navlinks.contains(e.target)) {
+    navlinks.classList.remove('show');
+  }
+});
+
+navlinks.querySelectorAll('a').forEach(link => {
+  link.addEventListener('click', () => {
+    navlinks.classList.remove('show');
+  });
+});
@@ -0,0 +1,19 @@
+// Format dates nicely
+        document.querySelectorAll('.date-info').forEach(el => {
+            const text = el.textContent;
+            if (text.includes('20')) {
+                const datePart = text.split(': ')[1];
+                if (datePart) {
+                    try {
+                        const date = new Date(datePart);
+                        if (!isNaN(date)) {
+                            const formatted = date.toLocaleString();
+                            el.innerHTML = el.innerHTML.replace(datePart, formatted);
+                        }
+                    } catch (e) {
+                        console.log('Date formatting error:', e);
+                    }
+                }
+            }
+        });
+    });
@@ -0,0 +1,81 @@
+    const hamburger = document.querySelector('.fa-bars');
+    const navlinks = document.querySelector('.nav-links');
+
+    hamburger.addEventListener('click', ()=>{
+        navlinks.classList.toggle('show');
+    });
+
+    document.addEventListener('click', (e) => {
+      if (navlinks.classList.contains('show') && 
+          e.target !== hamburger && 
+          !navlinks.contains(e.target)) {
+        navlinks.classList.remove('show');
+      }
+    });
+
+    navlinks.querySelectorAll('a').forEach(link => {
+      link.addEventListener('click', () => {
+        navlinks.classList.remove('show');
+      });
+    });
+
+    // Function to mark the latest post as "new"
+    function markLatestPost() {
+        const opportunityLinks = document.querySelectorAll('.opportunity-link');
+
+        if (opportunityLinks.length === 0) return;
+
+        // Find the latest post based on date
+        let latestPost = null;
+        let latestDate = new Date(0); // Start with earliest possible date
+
+        opportunityLinks.forEach(link => {
+            const dateElement = link.querySelector('.opportunity-meta span');
+            if (dateElement) {
+                const dateText = dateElement.textContent.trim();
+                const postDate = new Date(dateText);
+
+                if (postDate > latestDate) {
+                    latestDate = postDate;
+                    latestPost = link;
+                }
+            }
+        });
+
+        // Add "new" indicator to the latest post
+        if (latestPost) {
+            const newIndicator = document.createElement('div');
+            newIndicator.className = 'new-indicator';
+            newIndicator.innerHTML = '<i class="fas fa-star"></i>';
+            newIndicator.title = 'Latest Post';
+            latestPost.style.position = 'relative';
+            latestPost.appendChild(newIndicator);
+
+            // Optional: Also add a visual class for styling
+            latestPost.classList.add('latest-post');
+        }
+    }
+
+        // Type filtering is done by the server (?type=) so it covers every page
+document.addEventListener('DOMContentLoaded', function() {
+    markLatestPost();
+});
+
+            // Format dates nicely
+            document.querySelectorAll('.date-info').forEach(el => {
+                const text = el.textContent;
+                if (text.includes('20')) {
+                    const datePart = text.split(': ')[1];
+                    if (datePart) {
+                        try {
+                            const date = new Date(datePart);
+                            if (!isNaN(date)) {
+                                const formatted = date.toLocaleString();
+                                el.innerHTML = el.innerHTML.replace(datePart, formatted);
+                            }
+                        } catch (e) {
+                            console.log('Date formatting error:', e);
+                        }
+                    }
+                }
+            });
@@ -1,136 +1,58 @@
-from flask import Flask, request, jsonify, session, redirect, url_for, render_template, flash
-import sqlite3
+import threading
+from flask import Flask, Blueprint, current_app, request, jsonify, session, redirect, url_for, render_template, flash
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
-from dotenv import load_dotenv
 from datetime import datetime
-from actions import actions_bp
+from config import load_config
+from actions import actions_bp, DOCUMENT_CATEGORIES, OPPORTUNITY_TYPES
+import db
+from db import get_db
+from pagination import page_args, keyset_page
+from records import Document, Opportunity, Activity, Leader, fetch_one
+import cache
+from cache import cached_page, invalidate
+from conditional import conditional
+from uploads import upload_queue, release_media, media_type_of
+from outbox import outbox, queue_deletion, reconcile
+from resumable import resumable_bp, claim_upload, purge_stale_uploads
+from search import search_bp, rebuild_search_index
+from gallery import gallery_bp, add_gallery, release_gallery, load_galleries
+import migrations
+from migrations import check_schema
+from api import api_bp
+import images
+import delivery
+import media
+from media import media_bp
+import metrics
+from assets import assets
+import compression
 
-load_dotenv()
+main_bp = Blueprint('main_bp', __name__, cli_group=None)
 
-app = Flask(__name__)
-app.register_blueprint(actions_bp)
-app.config['SECRET_KEY'] = 'thebaddhshs'
+_workers_lock = threading.Lock()
 
-print(f"Current working directory: {os.getcwd()}")
-print(f"Files in current directory: {os.listdir('.')}")
+# Listing sort keys. Each one is backed by an index (see migrations.py) so a page
+# is an index range scan rather than a full sort.
+DOCUMENTS_ORDER = (('upload_date', 'DESC'), ('id', 'DESC'))
+OPPORTUNITIES_ORDER = (('created_date', 'DESC'), ('id', 'DESC'))
+ACTIVITIES_ORDER = (('created_date', 'DESC'), ('id', 'DESC'))
+LEADERS_ORDER = (('order_index', 'ASC'), ('created_date', 'DESC'), ('id', 'DESC'))
 
-cloudinary.config(
-cloud_name = os.getenv('CLOUDINARY_CLOUD_NAME'),
-api_key = os.getenv('CLOUDINARY_API_KEY'),
-api_secret = os.getenv('CLOUDINARY_API_SECRET')
-)
 
-def init_db():
-	conn = sqlite3.connect('tamsa.db')
-	cur = conn.cursor()
-	cur.execute('''
-	CREATE TABLE IF NOT EXISTS users(
-	id INTEGER PRIMARY KEY AUTOINCREMENT,
-	fullname TEXT UNIQUE NOT NULL,
-	email TEXT UNIQUE NOT NULL, 
-	password TEXT NOT NULL
-	)
-	''')
-	cur.execute('''
-    CREATE TABLE IF NOT EXISTS documents(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    category TEXT NOT NULL,
-    filename TEXT NOT NULL,
-    cloudinary_url TEXT NOT NULL,
-    cloudinary_public_id TEXT NOT NULL,
-    uploader TEXT NOT NULL,
-    upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-	cur.execute('''
-CREATE TABLE IF NOT EXISTS activities(
-id INTEGER PRIMARY KEY AUTOINCREMENT,
-title TEXT NOT NULL,
-description TEXT NOT NULL,
-date TEXT NOT NULL,
-location TEXT NOT NULL,
-media_url TEXT,
-media_public_id TEXT,
-media_type TEXT, -- 'image' or 'video'
-author TEXT NOT NULL,
-created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-''')
-	cur.execute('''
-    CREATE TABLE IF NOT EXISTS leaders(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    position TEXT NOT NULL,
-    picture_url TEXT NOT NULL,
-    picture_public_id TEXT NOT NULL,
-    bio TEXT,
-    order_index INTEGER DEFAULT 0,
-    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-	cur.execute('''
-CREATE TABLE IF NOT EXISTS opportunities (
-id INTEGER PRIMARY KEY AUTOINCREMENT,
-title TEXT NOT NULL,
-description TEXT NOT NULL,
-type TEXT NOT NULL, -- 'opportunity' or 'announcement'
-deadline TEXT, -- For opportunities
-event_date TEXT, -- For announcements/events
-location TEXT,
-media_url TEXT,
-media_public_id TEXT,
-media_type TEXT,  --'image' or 'video'
-created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-''')
-	cur.execute('''
-    CREATE TABLE IF NOT EXISTS admin_settings (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    setting_key TEXT UNIQUE NOT NULL,
-    setting_value TEXT NOT NULL,
-    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-	conn.commit()
-	conn.close()
-	
-	initialize_admin_password()
+def _like_escape(text):
+    """Match `text` literally inside a LIKE pattern using ESCAPE '\\'"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
 
-def initialize_admin_password():
-    """Initialize admin password from environment variable or set default"""
-    conn = sqlite3.connect('tamsa.db')
-    cur = conn.cursor()
-    
-    # Check if admin password exists
-    cur.execute('SELECT setting_value FROM admin_settings WHERE setting_key = ?', ('admin_password',))
-    result = cur.fetchone()
-    
-    if not result:
-        # Get password from environment variable or use default
-        default_password = os.getenv('ADMIN_PASSWORD', 'admin1234')
-        hashed_password = generate_password_hash(default_password)
-        
-        cur.execute('INSERT INTO admin_settings (setting_key, setting_value) VALUES (?, ?)', 
-                   ('admin_password', hashed_password))
-        conn.commit()
-        print("Admin password initialized")
-    
-    conn.close()
-    
 def verify_admin_password(password):
     """Verify admin password against stored hash"""
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
     
     cur.execute('SELECT setting_value FROM admin_settings WHERE setting_key = ?', ('admin_password',))
     result = cur.fetchone()
-    conn.close()
     
     if result and check_password_hash(result[0], password):
         return True
@@ -138,7 +60,7 @@ def verify_admin_password(password):
 
 def update_admin_password(new_password):
     """Update admin password in database"""
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
     
     hashed_password = generate_password_hash(new_password)
@@ -148,12 +70,29 @@ def update_admin_password(new_password):
     ''', ('admin_password', hashed_password))
     
     conn.commit()
-    conn.close()
     
-init_db()
+@main_bp.cli.command('reconcile-media')
+def reconcile_media_command():
+    """Delete Cloudinary assets that no post refers to any more"""
+    count = reconcile()
+    while outbox.drain():
+        pass
+    print(f'Queued {count} orphaned assets for deletion')
+
+@main_bp.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Re-index all posts for full-text search"""
+    rebuild_search_index()
+    print('Search index rebuilt')
+
+@main_bp.cli.command('build-images')
+def build_images_command():
+    """Generate resized WebP/AVIF/JPEG variants of the images in static/"""
+    generated, skipped = images.build_variants(current_app.static_folder)
+    print(f'Generated variants for {generated} images, {skipped} unchanged')
 
 # routes
-@app.route('/admin/login', methods=['GET', 'POST'])
+@main_bp.route('/admin/login', methods=['GET', 'POST'])
 def admin_login():
     if request.method == 'POST':
         password = request.form.get('password')
@@ -161,17 +100,17 @@ def admin_login():
         if verify_admin_password(password):
             session['admin_logged_in'] = True
             flash('Admin login successfully!', 'success')
-            return redirect(url_for('admin_dashboard'))
+            return redirect(url_for('main_bp.admin_dashboard'))
         else:
             flash('Invalid admin password', 'error')
     
     return render_template('admin_login.html')
 
-@app.route('/admin/dashboard', methods=['GET', 'POST'])
+@main_bp.route('/admin/dashboard', methods=['GET', 'POST'])
 def admin_dashboard():
     # Check if admin is logged in
     if not session.get('admin_logged_in'):
-        return redirect(url_for('admin_login'))
+        return redirect(url_for('main_bp.admin_login'))
     
     # Handle form submissions based on which form was submitted
     if request.method == 'POST':
@@ -181,82 +120,108 @@ def admin_dashboard():
             description = request.form.get('activity_description')
             date = request.form.get('activity_date')
             location = request.form.get('activity_location')
-            file = request.files.get('activity_media_file')
+            files = [f for f in request.files.getlist('activity_media_file') if f and f.filename != '']
+            upload_id = request.form.get('activity_upload_id')
             
             media_url = None
             media_public_id = None
             media_type = None
             
-            if file and file.filename != '':
-                allowed_image_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
-                allowed_video_types = ['video/mp4', 'video/mov', 'video/avi', 'video/webm']
-                
-                if file.content_type in allowed_image_types:
-                    media_type = 'image'
-                    resource_type = 'image'
-                elif file.content_type in allowed_video_types:
-                    media_type = 'video'
-                    resource_type = 'video'
-                else:
-                    flash('Please upload only image or video files', 'error')
-                    return redirect(url_for('admin_dashboard'))
-                
-                try:
-                    upload_result = cloudinary.uploader.upload(
-                        file,
-                        resource_type=resource_type,
-                        folder="tamsa/activities",
-                        use_filename=True
-                    )
-                    
-                    media_url = upload_result['secure_url']
-                    media_public_id = upload_result['public_id']
-                    
-                except Exception as e:
-                    flash(f'Error uploading media: {str(e)}', 'error')
-                    return redirect(url_for('admin_dashboard'))
+            if len(files) > current_app.config['UPLOAD_BATCH_MAX']:
+                flash(f"Please upload at most {current_app.config['UPLOAD_BATCH_MAX']} files at once", 'error')
+                return redirect(url_for('main_bp.admin_dashboard'))
+            
+            # Check every file before spooling any, so a rejected batch leaves nothing behind
+            selected = [(file, media_type_of(file.content_type)) for file in files]
+            if any(file_type is None for _, file_type in selected):
+                flash('Please upload only image or video files', 'error')
+                return redirect(url_for('main_bp.admin_dashboard'))
+            
+            # Large videos arrive beforehand through the resumable upload
+            # endpoint; otherwise the first file is the cover
+            if not upload_id and selected:
+                # Spool to disk; the upload queue pushes them to Cloudinary
+                file, media_type = selected.pop(0)
+                resource_type = media_type
+                spooled = upload_queue.spool(file)
             
-            # Save activity to database
-            conn = sqlite3.connect('tamsa.db')
+            # The rest make up the gallery
+            gallery = [(file.filename, file_type, upload_queue.spool(file)) for file, file_type in selected]
+            
+            # Save the activity and its gallery in one transaction, which
+            # also claims the resumable upload
+            conn = get_db()
             cur = conn.cursor()
+            if upload_id:
+                claimed = claim_upload(cur, upload_id)
+                if not claimed:
+                    upload_queue.discard(spooled for _, _, spooled in gallery)
+                    flash('The uploaded media could not be found, please upload it again', 'error')
+                    return redirect(url_for('main_bp.admin_dashboard'))
+                spooled, content_type = claimed
+                media_type = resource_type = content_type.split('/')[0]
+            
             cur.execute('''
-                INSERT INTO activities (title, description, date, location, media_url, media_public_id, media_type, author)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (title, description, date, location, media_url, media_public_id, media_type, 'Admin'))
+                INSERT INTO activities (title, description, date, location, media_url, media_public_id, media_type, author, media_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, description, date, location, media_url, media_public_id, media_type, 'Admin',
+                  'pending' if media_type else 'ready'))
+            activity_id = cur.lastrowid
+            job_ids = [upload_queue.add(cur, 'activities', activity_id, spooled, resource_type, 'tamsa/activities')] if media_type else []
+            job_ids += add_gallery(cur, activity_id, gallery)
             
             conn.commit()
-            conn.close()
+            upload_queue.submit_all(job_ids)
+            invalidate('activities')
+            if request.accept_mimetypes.best == 'application/json':
+                # The dashboard script polls this for per-file progress
+                return jsonify({'success': True, 'message': 'Activity uploaded successfully!',
+                                'status_url': url_for('gallery_bp.media_status', activity_id=activity_id)})
             flash('Activity uploaded successfully!', 'success')
         
         # Document Form
         elif 'doc_title' in request.form:
             title = request.form.get('doc_title')
             category = request.form.get('doc_category')
-            file = request.files.get('doc_file')
+            files = [f for f in request.files.getlist('doc_file') if f and f.filename != '']
             
-            if file and file.filename !='':
-                if file.content_type != 'application/pdf':
+            if files:
+                if any(file.content_type != 'application/pdf' for file in files):
                     flash('Please upload only PDF files', 'error')
-                    return redirect(url_for('admin_dashboard'))
+                    return redirect(url_for('main_bp.admin_dashboard'))
+                if len(files) > current_app.config['UPLOAD_BATCH_MAX']:
+                    flash(f"Please upload at most {current_app.config['UPLOAD_BATCH_MAX']} files at once", 'error')
+                    return redirect(url_for('main_bp.admin_dashboard'))
                 
                 try:
-                    upload_result = cloudinary.uploader.upload(
-                        file,
-                        resource_type="raw",
-                        folder="tamsa/documents",
-                        use_filename=True
-                    )
+                    spooled_files = [(file.filename, upload_queue.spool(file)) for file in files]
                     
-                    conn = sqlite3.connect('tamsa.db')
+                    # One row per file, all in one transaction; several files
+                    # share the title, told apart by their filenames
+                    conn = get_db()
                     cur = conn.cursor()
-                    cur.execute('''
-                        INSERT INTO documents (title, category, filename, cloudinary_url, cloudinary_public_id, uploader)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (title, category, file.filename, upload_result['secure_url'], upload_result['public_id'], 'Admin'))
+                    job_ids = []
+                    doc_ids = []
+                    for filename, spooled in spooled_files:
+                        doc_title = title if len(spooled_files) == 1 else f'{title} - {os.path.splitext(filename)[0]}'
+                        cur.execute('''
+                            INSERT INTO documents (title, category, filename, cloudinary_url, cloudinary_public_id, uploader, media_status)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ''', (doc_title, category, filename, '', '', 'Admin', 'pending'))
+                        doc_ids.append(cur.lastrowid)
+                        job_ids.append(upload_queue.add(cur, 'documents', doc_ids[-1], spooled, 'raw', 'tamsa/documents'))
                     
                     conn.commit()
-                    conn.close()
-                    flash('Document uploaded successfully!', 'success')
+                    upload_queue.submit_all(job_ids)
+                    invalidate('documents')
+                    if request.accept_mimetypes.best == 'application/json':
+                        return jsonify({'success': True, 'message': f'{len(doc_ids)} documents uploaded successfully!',
+                                        'status_url': url_for('gallery_bp.documents_status',
+                                                              ids=','.join(map(str, doc_ids)))})
+                    if len(spooled_files) == 1:
+                        flash('Document uploaded successfully!', 'success')
+                    else:
+                        flash(f'{len(spooled_files)} documents uploaded successfully!', 'success')
                     
                 except Exception as e:
                     flash(f'Error uploading file: {str(e)}', 'error')
@@ -270,30 +235,28 @@ def admin_dashboard():
             
             if not file or file.filename == '':
                 flash('Please select a picture', 'error')
-                return redirect(url_for('admin_dashboard'))
+                return redirect(url_for('main_bp.admin_dashboard'))
             
             allowed_image_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp']
             if file.content_type not in allowed_image_types:
                 flash('Please upload only image files (JPEG, PNG, GIF, WebP)', 'error')
-                return redirect(url_for('admin_dashboard'))
+                return redirect(url_for('main_bp.admin_dashboard'))
             
             try:
-                upload_result = cloudinary.uploader.upload(
-                    file,
-                    resource_type='image',
-                    folder="tamsa/leaders",
-                    use_filename=True
-                )
+                spooled = upload_queue.spool(file)
                 
-                conn = sqlite3.connect('tamsa.db')
+                conn = get_db()
                 cur = conn.cursor()
                 cur.execute('''
-                    INSERT INTO leaders (name, position, picture_url, picture_public_id, bio)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (name, position, upload_result['secure_url'], upload_result['public_id'], bio))
+                    INSERT INTO leaders (name, position, picture_url, picture_public_id, bio, media_status)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (name, position, '', '', bio, 'pending'))
+                job_id = upload_queue.add(cur, 'leaders', cur.lastrowid, spooled, 'image', 'tamsa/leaders')
                 
                 conn.commit()
-                conn.close()
+                if job_id:
+                    upload_queue.submit(job_id)
+                invalidate('leaders')
                 flash('Leader added successfully!', 'success')
                 
             except Exception as e:
@@ -308,12 +271,14 @@ def admin_dashboard():
             deadline = request.form.get('opp_deadline')
             event_date = request.form.get('opp_event_date')
             location = request.form.get('opp_location')
+            upload_id = request.form.get('opp_upload_id')
             
             media_url = None
             media_public_id = None
             media_type = None
+            spooled = None
             
-            if media and media.filename !='':
+            if not upload_id and media and media.filename !='':
             	allowed_image_type = ['image/png','image/jpeg','image/webp','image/gif']
             	allowed_video_type = ['video/mp4','video/mov','video/avi','video/webm']
             	
@@ -327,46 +292,56 @@ def admin_dashboard():
             	
             	else:
             		flash('Upload only image or video file', 'error')
-            		return redirect(url_for('admin_dashboard'))
-            	try:
-            		upload_result = cloudinary.uploader.upload(media, resource_type=resource_type, folder='tamsa/opportunity', use_filename=True)
-            		
-            		media_url = upload_result['secure_url']
-            		media_public_id = upload_result['public_id']
-            	
-            	except Exception as e:
-            		flash(f'Error in uploading media file: {str(e)}', 'error')
+            		return redirect(url_for('main_bp.admin_dashboard'))
             
             if not title or not description or not type_:
                 flash('Please fill in all required fields', 'error')
-                return redirect(url_for('admin_dashboard'))
+                return redirect(url_for('main_bp.admin_dashboard'))
             
             if type_ == 'opportunity' and not deadline:
                 flash('Please provide a deadline for opportunities', 'error')
-                return redirect(url_for('admin_dashboard'))
+                return redirect(url_for('main_bp.admin_dashboard'))
             
             if type_ == 'announcement' and not event_date:
                 flash('Please provide an event date for announcements', 'error')
-                return redirect(url_for('admin_dashboard'))
+                return redirect(url_for('main_bp.admin_dashboard'))
             
-            conn = sqlite3.connect('tamsa.db')
+            # Only claim or spool once the form is valid, so a rejected post
+            # leaves nothing behind and its resumable upload can be reused
+            conn = get_db()
             cur = conn.cursor()
+            if upload_id:
+                # Large videos arrive beforehand through the resumable upload
+                # endpoint; the claim commits together with the upload job
+                claimed = claim_upload(cur, upload_id)
+                if not claimed:
+                    flash('The uploaded media could not be found, please upload it again', 'error')
+                    return redirect(url_for('main_bp.admin_dashboard'))
+                spooled, content_type = claimed
+                media_type = resource_type = content_type.split('/')[0]
+            elif media_type:
+                spooled = upload_queue.spool(media)
+            
             cur.execute('''
-                INSERT INTO opportunities (title, media_url, media_public_id, media_type, description, type, deadline, event_date, location)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (title, media_url, media_public_id, media_type, description, type_, deadline, event_date, location))
+                INSERT INTO opportunities (title, media_url, media_public_id, media_type, description, type, deadline, event_date, location, author, media_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, media_url, media_public_id, media_type, description, type_, deadline, event_date, location, 'Admin',
+                  'pending' if media_type else 'ready'))
+            job_id = upload_queue.add(cur, 'opportunities', cur.lastrowid, spooled, resource_type, 'tamsa/opportunity') if media_type else None
             
             conn.commit()
-            conn.close()
+            if job_id:
+                upload_queue.submit(job_id)
+            invalidate('opportunities')
             flash('Opportunity/Announcement posted successfully!', 'success')
     
     return render_template('admin_dashboard.html')
 
-@app.route('/admin/change-password', methods=['GET','POST'])
+@main_bp.route('/admin/change-password', methods=['GET','POST'])
 def change_admin_password():
     """Handle admin password change"""
     if not session.get('admin_logged_in'):
-        return redirect(url_for('admin_login'))
+        return redirect(url_for('main_bp.admin_login'))
     
     if request.method == 'POST':
         old_password = request.form.get('old_password')
@@ -394,21 +369,24 @@ def change_admin_password():
         # Update password
         update_admin_password(new_password)
         flash('Password changed successfully!', 'success')
-        return redirect(url_for('admin_dashboard'))
+        return redirect(url_for('main_bp.admin_dashboard'))
     
     return render_template('change.html')
 	
-@app.route('/admin/logout')
+@main_bp.route('/admin/logout')
 def admin_logout():
     session.pop('admin_logged_in', None)
     flash('Admin logged out successfully', 'success')
-    return redirect(url_for('admin_login'))
+    return redirect(url_for('main_bp.admin_login'))
 
-@app.route('/')
+@main_bp.route('/')
+@cached_page()
 def home():
 	return render_template('homepage.html')
 	
-@app.route('/documents', methods=['GET', 'POST'])
+@main_bp.route('/documents', methods=['GET', 'POST'])
+@conditional('documents')
+@cached_page('documents')
 def documents():
     if request.method == 'POST':
         # Handle document upload
@@ -423,78 +401,77 @@ def documents():
                 return redirect(request.url)
             
             try:
-                # Upload to Cloudinary
-                upload_result = cloudinary.uploader.upload(
-                    file,
-                    resource_type = "raw",  # Use "raw" for PDF files
-                    folder = "tamsa/documents",
-                    use_filename = True
-                )
+                # Spool to disk; the upload queue pushes it to Cloudinary as "raw"
+                spooled = upload_queue.spool(file)
                 
                 # Save document info to database
-                conn = sqlite3.connect('tamsa.db')
+                conn = get_db()
                 cur = conn.cursor()
                 cur.execute('''
-                    INSERT INTO documents (title, category, filename, cloudinary_url, cloudinary_public_id, uploader)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (title, category, file.filename, upload_result['secure_url'], upload_result['public_id'], 'User'))
+                    INSERT INTO documents (title, category, filename, cloudinary_url, cloudinary_public_id, uploader, media_status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (title, category, file.filename, '', '', 'User', 'pending'))
+                job_id = upload_queue.add(cur, 'documents', cur.lastrowid, spooled, 'raw', 'tamsa/documents')
                 
                 conn.commit()
-                conn.close()
+                if job_id:
+                    upload_queue.submit(job_id)
+                invalidate('documents')
                 
                 flash('Document uploaded successfully!', 'success')
                 
             except Exception as e:
                 flash(f'Error uploading file: {str(e)}', 'error')
         
-        return redirect(url_for('documents'))
-    
-    # GET request - fetch documents from database
-    conn = sqlite3.connect('tamsa.db')
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM documents ORDER BY upload_date DESC')
-    documents_data = cur.fetchall()
-    conn.close()
-    
-    # Convert to list of dictionaries for easier template handling
-    documents_list = []
-    for doc in documents_data:
-        documents_list.append({
-            'id': doc[0],
-            'title': doc[1],
-            'category': doc[2],
-            'filename': doc[3],
-            'url': doc[4],
-            'public_id': doc[5],
-            'uploader': doc[6],
-            'upload_date': doc[7]
-        })
-    
-    return render_template('documents.html', documents=documents_list)
+        return redirect(url_for('main_bp.documents'))
+    
+    # GET request - fetch documents from database. Filters are part of the
+    # query so they reach past the current page, and ride along in the pager
+    filters = {}
+    where = ['archived = 0']
+    params = []
+    category = request.args.get('category')
+    if category in DOCUMENT_CATEGORIES:
+        filters['category'] = category
+        where.append('category = ?')
+        params.append(category)
+    query = request.args.get('q', '').strip()
+    if query:
+        filters['q'] = query
+        where.append("title LIKE ? ESCAPE '\\'")
+        params.append(f'%{_like_escape(query)}%')
+    
+    conn = get_db()
+    per_page, after = page_args(DOCUMENTS_ORDER)
+    documents_list, next_cursor = keyset_page(conn, 'documents', DOCUMENTS_ORDER, per_page, after,
+                                              where=' AND '.join(where), params=params, row_type=Document)
+    
+    return render_template('documents.html', documents=documents_list, next_cursor=next_cursor, filters=filters)
 
-@app.route('/documents/delete/<int:doc_id>', methods=['POST'])
+@main_bp.route('/documents/delete/<int:doc_id>', methods=['POST'])
 def delete_document(doc_id):
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
     cur.execute('SELECT cloudinary_public_id FROM documents WHERE id = ?', (doc_id,))
     result = cur.fetchone()
     
     if result:
         public_id = result[0]
-        try:
-            # Delete from Cloudinary
-            cloudinary.uploader.destroy(public_id, resource_type="raw")
-            # Delete from database
-            cur.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
-            conn.commit()
-            flash('Document deleted successfully!', 'success')
-        except Exception as e:
-            flash(f'Error deleting document: {str(e)}', 'error')
+        # Delete from database; the Cloudinary file is queued for removal in
+        # the same transaction once no other post shares it
+        cur.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+        if public_id and release_media(cur, public_id):
+            queue_deletion(cur, public_id, 'raw')
+        conn.commit()
+        outbox.notify()
+        invalidate('documents')
+        flash('Document deleted successfully!', 'success')
     
-    conn.close()
-    return redirect(url_for('documents'))
+    return redirect(url_for('main_bp.documents'))
 
-@app.route('/opportunities', methods=['GET', 'POST'])
+@main_bp.route('/opportunities', methods=['GET', 'POST'])
+@conditional('opportunities')
+@cached_page('opportunities')
 def opportunities():
     if request.method == 'POST':
         # Handle opportunity/announcement creation
@@ -520,7 +497,7 @@ def opportunities():
             return redirect(request.url)
         
         # Save to database
-        conn = sqlite3.connect('tamsa.db')
+        conn = get_db()
         cur = conn.cursor()
         cur.execute('''
             INSERT INTO opportunities (title, description, type, deadline, event_date, location, author)
@@ -528,77 +505,65 @@ def opportunities():
         ''', (title, description, type_, deadline, event_date, location, 'User'))
         
         conn.commit()
-        conn.close()
+        invalidate('opportunities')
         
         flash('Posted successfully!', 'success')
-        return redirect(url_for('opportunities'))
-    
-    # GET request - fetch opportunities and announcements from database
-    conn = sqlite3.connect('tamsa.db')
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM opportunities ORDER BY created_date DESC')
-    opportunities_data = cur.fetchall()
-    conn.close()
-    
-    # Convert to list of dictionaries for easier template handling
-    opportunities_list = []
-    for opp in opportunities_data:
-        opportunities_list.append({
-            'id': opp[0],
-            'title': opp[1],
-            'description': opp[2],
-            'type': opp[3],
-            'deadline': opp[4],
-            'event_date': opp[5],
-            'location': opp[6],
-            'media_url': opp[7],
-            'media_public_id': opp[8],
-            'media_type': opp[9],
-            'created_date': opp[10]
-        })
-    
-    return render_template('opportunities.html', opportunities=opportunities_list)
+        return redirect(url_for('main_bp.opportunities'))
+    
+    # GET request - fetch opportunities and announcements from database,
+    # filtered by ?type= in the query so every page is filtered
+    filters = {}
+    where = 'archived = 0'
+    params = ()
+    type_ = request.args.get('type')
+    if type_ in OPPORTUNITY_TYPES.values():
+        filters['type'] = type_
+        where += ' AND type = ?'
+        params = (type_,)
+    
+    conn = get_db()
+    per_page, after = page_args(OPPORTUNITIES_ORDER)
+    opportunities_list, next_cursor = keyset_page(conn, 'opportunities', OPPORTUNITIES_ORDER, per_page, after,
+                                                  where=where, params=params, row_type=Opportunity)
+    
+    return render_template('opportunities.html', opportunities=opportunities_list, next_cursor=next_cursor,
+                           filters=filters)
 
-@app.route('/opportunities/delete/<int:opp_id>', methods=['POST'])
+@main_bp.route('/opportunities/delete/<int:opp_id>', methods=['POST'])
 def delete_opportunity(opp_id):
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
+    cur.execute('SELECT media_public_id, media_type FROM opportunities WHERE id = ?', (opp_id,))
+    result = cur.fetchone()
     cur.execute('DELETE FROM opportunities WHERE id = ?', (opp_id,))
+    if result and result[0] and release_media(cur, result[0]):
+        queue_deletion(cur, result[0], 'image' if result[1] == 'image' else 'video')
     conn.commit()
-    conn.close()
+    outbox.notify()
+    invalidate('opportunities', f'opportunities:{opp_id}')
     
     flash('Item deleted successfully!', 'success')
-    return redirect(url_for('opportunities'))
+    return redirect(url_for('main_bp.opportunities'))
 
-@app.route('/opportunity/<int:opp_id>')
+@main_bp.route('/opportunity/<int:opp_id>')
+@conditional('opportunities')
+@cached_page('opportunities:{opp_id}')
 def opportunity_detail(opp_id):
     # Fetch specific opportunity from database
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
-    cur.execute('SELECT * FROM opportunities WHERE id = ?', (opp_id,))
-    opp_data = cur.fetchone()
-    conn.close()
+    cur.execute(f'SELECT {Opportunity.select_list} FROM opportunities WHERE id = ?', (opp_id,))
+    opportunity = fetch_one(cur, Opportunity)
     
-    if opp_data:
-        opportunity = {
-            'id': opp_data[0],
-            'title': opp_data[1],
-            'description': opp_data[2],
-            'type': opp_data[3],
-            'deadline': opp_data[4],
-            'event_date': opp_data[5],
-            'location': opp_data[6],
-            'media_url': opp_data[7],
-            'media_public_id': opp_data[8],
-            'media_type': opp_data[9],
-            'created_date': opp_data[10]
-        }
+    if opportunity:
         return render_template('opener.html', opp=opportunity)
     else:
         flash('Opportunity not found', 'error')
-        return redirect(url_for('opportunities')) 	
+        return redirect(url_for('main_bp.opportunities')) 	
 
-@app.route('/activities', methods=['GET', 'POST'])
+@main_bp.route('/activities', methods=['GET', 'POST'])
+@conditional('activities')
+@cached_page('activities')
 def activities():
     if request.method == 'POST':
         # Handle activity creation with media upload
@@ -627,64 +592,38 @@ def activities():
                 flash('Please upload only image or video files', 'error')
                 return redirect(request.url)
             
-            try:
-                # Upload to Cloudinary
-                upload_result = cloudinary.uploader.upload(
-                    file,
-                    resource_type=resource_type,
-                    folder="tamsa/activities",
-                    use_filename=True
-                )
-                
-                media_url = upload_result['secure_url']
-                media_public_id = upload_result['public_id']
-                
-            except Exception as e:
-                flash(f'Error uploading media: {str(e)}', 'error')
-                return redirect(request.url)
+            # Spool to disk; the upload queue pushes it to Cloudinary
+            spooled = upload_queue.spool(file)
         
         # Save activity to database
-        conn = sqlite3.connect('tamsa.db')
+        conn = get_db()
         cur = conn.cursor()
         cur.execute('''
-            INSERT INTO activities (title, description, date, location, media_url, media_public_id, media_type, author)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, description, date, location, media_url, media_public_id, media_type, 'User'))
+            INSERT INTO activities (title, description, date, location, media_url, media_public_id, media_type, author, media_status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (title, description, date, location, media_url, media_public_id, media_type, 'User',
+              'pending' if media_type else 'ready'))
+        job_id = upload_queue.add(cur, 'activities', cur.lastrowid, spooled, resource_type, 'tamsa/activities') if media_type else None
         
         conn.commit()
-        conn.close()
+        if job_id:
+            upload_queue.submit(job_id)
+        invalidate('activities')
         
         flash('Activity posted successfully!', 'success')
-        return redirect(url_for('activities'))
+        return redirect(url_for('main_bp.activities'))
     
     # GET request - fetch activities from database
-    conn = sqlite3.connect('tamsa.db')
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM activities ORDER BY created_date DESC')
-    activities_data = cur.fetchall()
-    conn.close()
-    
-    # Convert to list of dictionaries for easier template handling
-    activities_list = []
-    for activity in activities_data:
-        activities_list.append({
-            'id': activity[0],
-            'title': activity[1],
-            'description': activity[2],
-            'date': activity[3],
-            'location': activity[4],
-            'media_url': activity[5],
-            'media_public_id': activity[6],
-            'media_type': activity[7],
-            'author': activity[8],
-            'created_date': activity[9]
-        })
+    conn = get_db()
+    per_page, after = page_args(ACTIVITIES_ORDER)
+    activities_list, next_cursor = keyset_page(conn, 'activities', ACTIVITIES_ORDER, per_page, after, where='archived = 0', row_type=Activity)
+    galleries = load_galleries(conn, [activity.id for activity in activities_list])
     
-    return render_template('activities.html', activities=activities_list)
+    return render_template('activities.html', activities=activities_list, galleries=galleries, next_cursor=next_cursor)
 
-@app.route('/activities/delete/<int:activity_id>', methods=['POST'])
+@main_bp.route('/activities/delete/<int:activity_id>', methods=['POST'])
 def delete_activity(activity_id):
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
     cur.execute('SELECT media_public_id, media_type FROM activities WHERE id = ?', (activity_id,))
     result = cur.fetchone()
@@ -692,23 +631,23 @@ def delete_activity(activity_id):
     if result:
         public_id = result[0]
         media_type = result[1]
-        if public_id:  # Only delete from Cloudinary if there's media
-            try:
-                # Delete from Cloudinary
-                resource_type = 'image' if media_type == 'image' else 'video'
-                cloudinary.uploader.destroy(public_id, resource_type=resource_type)
-            except Exception as e:
-                flash(f'Error deleting media: {str(e)}', 'error')
         
-        # Delete from database
+        # Delete from database; any media no other post shares is queued for
+        # removal from Cloudinary in the same transaction
+        release_gallery(cur, [activity_id])
         cur.execute('DELETE FROM activities WHERE id = ?', (activity_id,))
+        if public_id and release_media(cur, public_id):
+            queue_deletion(cur, public_id, 'image' if media_type == 'image' else 'video')
         conn.commit()
+        outbox.notify()
+        invalidate('activities')
         flash('Activity deleted successfully!', 'success')
     
-    conn.close()
-    return redirect(url_for('activities'))     
+    return redirect(url_for('main_bp.activities'))     
 
-@app.route('/leadership', methods=['GET', 'POST'])
+@main_bp.route('/leadership', methods=['GET', 'POST'])
+@conditional('leaders')
+@cached_page('leaders')
 def leadership():
     if request.method == 'POST':
         # Handle leader creation
@@ -729,76 +668,106 @@ def leadership():
             return redirect(request.url)
         
         try:
-            # Upload to Cloudinary
-            upload_result = cloudinary.uploader.upload(
-                file,
-                resource_type='image',
-                folder="tamsa/leaders",
-                use_filename=True
-            )
+            # Spool to disk; the upload queue pushes it to Cloudinary
+            spooled = upload_queue.spool(file)
             
             # Save leader info to database
-            conn = sqlite3.connect('tamsa.db')
+            conn = get_db()
             cur = conn.cursor()
             cur.execute('''
-                INSERT INTO leaders (name, position, picture_url, picture_public_id, bio, order_index)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (name, position, upload_result['secure_url'], upload_result['public_id'], bio, order_index))
+                INSERT INTO leaders (name, position, picture_url, picture_public_id, bio, order_index, media_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (name, position, '', '', bio, order_index, 'pending'))
+            job_id = upload_queue.add(cur, 'leaders', cur.lastrowid, spooled, 'image', 'tamsa/leaders')
             
             conn.commit()
-            conn.close()
+            if job_id:
+                upload_queue.submit(job_id)
+            invalidate('leaders')
             
             flash('Leader added successfully!', 'success')
             
         except Exception as e:
             flash(f'Error uploading picture: {str(e)}', 'error')
         
-        return redirect(url_for('leadership'))
+        return redirect(url_for('main_bp.leadership'))
     
     # GET request - fetch leaders from database
-    conn = sqlite3.connect('tamsa.db')
-    cur = conn.cursor()
-    cur.execute('SELECT * FROM leaders ORDER BY order_index, created_date DESC')
-    leaders_data = cur.fetchall()
-    conn.close()
-    
-    # Convert to list of dictionaries for easier template handling
-    leaders_list = []
-    for leader in leaders_data:
-        leaders_list.append({
-            'id': leader[0],
-            'name': leader[1],
-            'position': leader[2],
-            'picture_url': leader[3],
-            'picture_public_id': leader[4],
-            'bio': leader[5],
-            'order_index': leader[6],
-            'created_date': leader[7]
-        })
+    conn = get_db()
+    per_page, after = page_args(LEADERS_ORDER)
+    leaders_list, next_cursor = keyset_page(conn, 'leaders', LEADERS_ORDER, per_page, after, where='archived = 0', row_type=Leader)
     
-    return render_template('leadership.html', leaders=leaders_list)
+    return render_template('leadership.html', leaders=leaders_list, next_cursor=next_cursor)
 
-@app.route('/leadership/delete/<int:leader_id>', methods=['POST'])
+@main_bp.route('/leadership/delete/<int:leader_id>', methods=['POST'])
 def delete_leader(leader_id):
-    conn = sqlite3.connect('tamsa.db')
+    conn = get_db()
     cur = conn.cursor()
     cur.execute('SELECT picture_public_id FROM leaders WHERE id = ?', (leader_id,))
     result = cur.fetchone()
     
     if result:
         public_id = result[0]
-        try:
-            # Delete from Cloudinary
-            cloudinary.uploader.destroy(public_id, resource_type="image")
-            # Delete from database
-            cur.execute('DELETE FROM leaders WHERE id = ?', (leader_id,))
-            conn.commit()
-            flash('Leader deleted successfully!', 'success')
-        except Exception as e:
-            flash(f'Error deleting leader: {str(e)}', 'error')
+        # Delete from database; the Cloudinary picture is queued for removal
+        # in the same transaction once no other post shares it
+        cur.execute('DELETE FROM leaders WHERE id = ?', (leader_id,))
+        if public_id and release_media(cur, public_id):
+            queue_deletion(cur, public_id, 'image')
+        conn.commit()
+        outbox.notify()
+        invalidate('leaders')
+        flash('Leader deleted successfully!', 'success')
     
-    conn.close()
-    return redirect(url_for('leadership'))
+    return redirect(url_for('main_bp.leadership'))
     
+def start_workers(app):
+    """Resume queued uploads and start the deletion outbox in this process.
+
+    Safe to call more than once; nothing starts until the schema is current.
+    """
+    with _workers_lock:
+        if app.extensions.get('tamsa_workers'):
+            return True
+        with app.app_context():
+            if not check_schema():
+                return False
+            upload_queue.resume()
+            purge_stale_uploads()
+        outbox.start()
+        app.extensions['tamsa_workers'] = True
+        return True
+
+def create_app(config=None):
+    """Build the application. Nothing here touches the database or Cloudinary;
+    background workers start with the first request (or start_workers)."""
+    app = Flask(__name__)
+    app.config.from_mapping(load_config(config))
+    app.register_blueprint(main_bp)
+    app.register_blueprint(actions_bp)
+    app.register_blueprint(resumable_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(media_bp)
+    app.register_blueprint(gallery_bp)
+    db.init_app(app)
+    metrics.init_app(app)
+    cache.init_app(app)
+    upload_queue.init_app(app)
+    outbox.init_app(app)
+    media.init_app(app)
+    images.init_app(app)
+    delivery.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
+    migrations.init_app(app)
+
+    @app.before_request
+    def _start_workers():
+        if not app.extensions.get('tamsa_workers'):
+            start_workers(app)
+
+    return app
+
+# Development server only; production runs gunicorn -c gunicorn.conf.py
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port='8000', debug=False)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port='8000', debug=False)
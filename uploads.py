@@ -0,0 +1,322 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+from db import get_db, ensure_column
+from cache import invalidate
+from conditional import CONTENT_TABLES
+from outbox import outbox, queue_deletion
+from media import get_store
+from metrics import timed_remote
+
+DEFAULT_SPOOL_DIR = os.path.join('uploads', 'spool')
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_MAX = 50
+MAX_ATTEMPTS = 5
+MAX_BACKOFF = 300
+READ_BUFFER = 64 * 1024
+
+# A file saved to the spool directory, with the SHA-256 of its contents
+Spooled = namedtuple('Spooled', ['path', 'content_hash'])
+
+# Where each content table keeps the delivered media
+MEDIA_COLUMNS = {
+    'activities': ('media_url', 'media_public_id'),
+    'opportunities': ('media_url', 'media_public_id'),
+    'documents': ('cloudinary_url', 'cloudinary_public_id'),
+    'leaders': ('picture_url', 'picture_public_id'),
+    'activity_media': ('media_url', 'media_public_id'),
+}
+# Child tables whose rows are shown on their parent's pages
+CACHE_TAGS = {'activity_media': 'activities'}
+
+IMAGE_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+VIDEO_TYPES = ('video/mp4', 'video/mov', 'video/avi', 'video/webm')
+
+
+def create_upload_tables(cur):
+    """Create the upload job table and the media_status column it drives"""
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS media_uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target_table TEXT NOT NULL,
+    target_id INTEGER NOT NULL,
+    spool_path TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    content_hash TEXT,
+    status TEXT NOT NULL DEFAULT 'pending', -- 'pending', 'uploading', 'done' or 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_media_uploads_status ON media_uploads(status)')
+    ensure_column(cur, 'media_uploads', 'content_hash', 'TEXT')
+    for table in CONTENT_TABLES:
+        ensure_column(cur, table, 'media_status', "TEXT DEFAULT 'ready'")
+
+    # One row per distinct remote asset, shared by every post that uses it
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS media_blobs (
+    content_hash TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    url TEXT NOT NULL,
+    public_id TEXT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 1,
+    created_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, resource_type)
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_media_blobs_public_id ON media_blobs(public_id)')
+
+
+def media_type_of(content_type):
+    """'image' or 'video' for an accepted upload type, else None"""
+    if content_type in IMAGE_TYPES:
+        return 'image'
+    if content_type in VIDEO_TYPES:
+        return 'video'
+    return None
+
+
+def hash_file(path):
+    """SHA-256 of a file on disk, read in small blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BUFFER), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def acquire_blob(cur, content_hash, resource_type):
+    """Take a reference on an already uploaded asset, returning (url, public_id)"""
+    cur.execute('''
+        UPDATE media_blobs SET ref_count = ref_count + 1
+        WHERE content_hash = ? AND resource_type = ?
+        RETURNING url, public_id
+    ''', (content_hash, resource_type))
+    return cur.fetchone()
+
+
+def release_media(cur, public_id):
+    """Drop one reference to a remote asset.
+
+    Returns True when the caller should destroy the asset: either this was
+    the last reference, or the asset predates deduplication and was never
+    tracked.
+    """
+    cur.execute('''
+        UPDATE media_blobs SET ref_count = ref_count - 1
+        WHERE public_id = ?
+        RETURNING ref_count
+    ''', (public_id,))
+    result = cur.fetchone()
+    if result is None:
+        return True
+    if result[0] <= 0:
+        cur.execute('DELETE FROM media_blobs WHERE public_id = ?', (public_id,))
+        return True
+    return False
+
+
+class UploadQueue:
+    """Pushes spooled files to Cloudinary on a bounded pool of threads.
+
+    Requests save the file to local disk and record a job in the same
+    transaction as the row that will own the media, then return straight
+    away. A worker uploads the file, fills in the url/public_id columns and
+    marks the row ready, retrying with backoff on failure.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.spool_dir = DEFAULT_SPOOL_DIR
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.spool_dir = app.config.setdefault('UPLOAD_SPOOL_DIR', DEFAULT_SPOOL_DIR)
+        app.config.setdefault('UPLOAD_WORKERS', DEFAULT_WORKERS)
+        app.config.setdefault('UPLOAD_BATCH_MAX', DEFAULT_BATCH_MAX)
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    workers = self.app.config['UPLOAD_WORKERS'] if self.app else DEFAULT_WORKERS
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='upload')
+        return self._executor
+
+    def spool(self, file):
+        """Save an incoming upload to local disk, hashing it on the way"""
+        directory = os.path.join(self.spool_dir, uuid.uuid4().hex)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, secure_filename(file.filename) or 'upload')
+        digest = hashlib.sha256()
+        with open(path, 'wb') as f:
+            for block in iter(lambda: file.stream.read(READ_BUFFER), b''):
+                digest.update(block)
+                f.write(block)
+        return Spooled(path, digest.hexdigest())
+
+    def discard(self, spooled_files):
+        """Remove spooled files that will not be queued after all"""
+        for spooled in spooled_files:
+            shutil.rmtree(os.path.dirname(spooled.path), ignore_errors=True)
+
+    def add(self, cur, table, row_id, spooled, resource_type, folder):
+        """Record an upload job; call submit() with the id after committing.
+
+        If the same content was uploaded before, the row is pointed at the
+        existing asset straight away and no job is created (returns None).
+        Files spooled without a hash are checked by the worker instead.
+        """
+        existing = spooled.content_hash and acquire_blob(cur, spooled.content_hash, resource_type)
+        if existing:
+            url_column, public_id_column = MEDIA_COLUMNS[table]
+            cur.execute(f'''
+                UPDATE {table} SET {url_column} = ?, {public_id_column} = ?, media_status = 'ready'
+                WHERE id = ?
+            ''', (existing[0], existing[1], row_id))
+            shutil.rmtree(os.path.dirname(spooled.path), ignore_errors=True)
+            return None
+
+        cur.execute('''
+            INSERT INTO media_uploads (target_table, target_id, spool_path, resource_type, folder, content_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (table, row_id, spooled.path, resource_type, folder, spooled.content_hash))
+        return cur.lastrowid
+
+    def submit(self, job_id):
+        self.executor.submit(self._run, job_id)
+
+    def submit_all(self, job_ids):
+        """Submit the jobs of a batch; they run UPLOAD_WORKERS at a time"""
+        for job_id in job_ids:
+            if job_id:
+                self.submit(job_id)
+
+    def resume(self):
+        """Requeue jobs left behind by a previous process"""
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute('''
+            UPDATE media_uploads SET status = 'pending'
+            WHERE status = 'uploading' AND updated_date < datetime('now', '-30 minutes')
+        ''')
+        conn.commit()
+        cur.execute("SELECT id FROM media_uploads WHERE status = 'pending'")
+        for (job_id,) in cur.fetchall():
+            self.submit(job_id)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            self._process(job_id)
+
+    def _process(self, job_id):
+        conn = get_db()
+        cur = conn.cursor()
+
+        # Claim the job so another process resuming the queue skips it
+        cur.execute('''
+            UPDATE media_uploads SET status = 'uploading', attempts = attempts + 1, updated_date = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'pending'
+        ''', (job_id,))
+        conn.commit()
+        if cur.rowcount != 1:
+            return
+
+        cur.execute('''
+            SELECT target_table, target_id, spool_path, resource_type, folder, content_hash, attempts
+            FROM media_uploads WHERE id = ?
+        ''', (job_id,))
+        table, row_id, path, resource_type, folder, content_hash, attempts = cur.fetchone()
+        content_hash = content_hash or hash_file(path)
+
+        # An identical file may have finished uploading since this job was queued
+        existing = acquire_blob(cur, content_hash, resource_type)
+        if existing:
+            self._finish(job_id, table, row_id, path, resource_type, *existing)
+            return
+
+        # Videos go through the chunked large-file API so a dropped
+        # connection only repeats one part
+        store = get_store()
+        upload = store.upload_large if resource_type == 'video' else store.upload
+        try:
+            with timed_remote('upload'):
+                uploaded = upload(path, resource_type, folder)
+        except Exception as e:
+            self._retry_or_fail(job_id, table, row_id, path, attempts, str(e))
+            return
+
+        # Register the asset. If another worker registered the same content
+        # meanwhile, share theirs and drop the copy we just made.
+        cur.execute('''
+            INSERT INTO media_blobs (content_hash, resource_type, url, public_id)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (content_hash, resource_type) DO UPDATE SET ref_count = ref_count + 1
+            RETURNING url, public_id
+        ''', (content_hash, resource_type, uploaded.url, uploaded.public_id))
+        url, public_id = cur.fetchone()
+        if public_id != uploaded.public_id:
+            queue_deletion(cur, uploaded.public_id, resource_type)
+
+        self._finish(job_id, table, row_id, path, resource_type, url, public_id)
+
+    def _finish(self, job_id, table, row_id, path, resource_type, url, public_id):
+        conn = get_db()
+        cur = conn.cursor()
+        url_column, public_id_column = MEDIA_COLUMNS[table]
+        cur.execute(f'''
+            UPDATE {table} SET {url_column} = ?, {public_id_column} = ?, media_status = 'ready'
+            WHERE id = ?
+        ''', (url, public_id, row_id))
+        if cur.rowcount == 0 and release_media(cur, public_id):
+            # The post was deleted while its media was still uploading
+            queue_deletion(cur, public_id, resource_type)
+        cur.execute('''
+            UPDATE media_uploads SET status = 'done', last_error = NULL, updated_date = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (job_id,))
+        conn.commit()
+        outbox.notify()
+
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        invalidate(CACHE_TAGS.get(table, table), f'{table}:{row_id}')
+
+    def _retry_or_fail(self, job_id, table, row_id, path, attempts, error):
+        conn = get_db()
+        cur = conn.cursor()
+        if attempts >= MAX_ATTEMPTS:
+            cur.execute('''
+                UPDATE media_uploads SET status = 'failed', last_error = ?, updated_date = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (error, job_id))
+            cur.execute(f"UPDATE {table} SET media_status = 'failed' WHERE id = ?", (row_id,))
+            conn.commit()
+            # Nothing retries a failed job, so its spooled file would only pile up
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            invalidate(CACHE_TAGS.get(table, table), f'{table}:{row_id}')
+            return
+
+        cur.execute('''
+            UPDATE media_uploads SET status = 'pending', last_error = ?, updated_date = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (error, job_id))
+        conn.commit()
+
+        timer = threading.Timer(min(2 ** attempts, MAX_BACKOFF), self.submit, (job_id,))
+        timer.daemon = True
+        timer.start()
+
+
+upload_queue = UploadQueue()